@@ -0,0 +1,23 @@
+-- Enforce a single RSVP per guest so POST /rsvp/ can upsert on guest_id.
+-- Apply to an existing database with:
+--   docker-compose exec -T db psql -U $POSTGRES_USER -d $POSTGRES_DB < Database/migrations/001_unique_rsvp_per_guest.sql
+BEGIN;
+
+-- Keep only the most recently updated RSVP for guests that have duplicates
+DELETE FROM rsvp_responses r
+USING rsvp_responses newer
+WHERE r.guest_id = newer.guest_id
+  AND (COALESCE(r.updated_at, '-infinity'), r.id)
+    < (COALESCE(newer.updated_at, '-infinity'), newer.id);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'rsvp_responses_guest_id_key'
+    ) THEN
+        ALTER TABLE rsvp_responses
+            ADD CONSTRAINT rsvp_responses_guest_id_key UNIQUE (guest_id);
+    END IF;
+END $$;
+
+COMMIT;
@@ -0,0 +1,33 @@
+-- Add the guest data change counter used for ETags on /guest-details/.
+-- Apply to an existing database with:
+--   docker-compose exec -T db psql -U $POSTGRES_USER -d $POSTGRES_DB < Database/migrations/002_guest_data_version.sql
+BEGIN;
+
+-- Change counter for guest data. Triggers bump it inside every writing
+-- transaction so the API can answer conditional requests for guest details
+-- without re-reading the view.
+CREATE TABLE IF NOT EXISTS data_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO data_versions (name) VALUES ('guest_details') ON CONFLICT (name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_guest_data_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE name = 'guest_details';
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS guests_bump_data_version ON guests;
+CREATE TRIGGER guests_bump_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON guests
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_guest_data_version();
+
+DROP TRIGGER IF EXISTS rsvp_responses_bump_data_version ON rsvp_responses;
+CREATE TRIGGER rsvp_responses_bump_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON rsvp_responses
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_guest_data_version();
+
+COMMIT;
@@ -0,0 +1,89 @@
+-- Add the trigger-maintained RSVP summary behind GET /stats and fill it.
+-- Apply to an existing database with:
+--   docker-compose exec -T db psql -U $POSTGRES_USER -d $POSTGRES_DB < Database/migrations/003_rsvp_stats.sql
+BEGIN;
+
+
+-- Running RSVP totals kept up to date by triggers, so GET /stats reads a
+-- handful of rows instead of scanning every response
+CREATE TABLE IF NOT EXISTS rsvp_stats (
+    dimension VARCHAR(20) NOT NULL,
+    bucket VARCHAR(50) NOT NULL,
+    responses BIGINT NOT NULL DEFAULT 0,
+    people BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, bucket)
+);
+
+-- The summary buckets a single RSVP counts towards
+CREATE OR REPLACE FUNCTION rsvp_stats_buckets(r rsvp_responses)
+RETURNS TABLE (dimension TEXT, bucket TEXT) AS $$
+    SELECT d.dimension, d.bucket
+    FROM (VALUES
+        ('total', 'all'),
+        ('relationship', r.guest_relationship::text),
+        ('visiting_venue', CASE WHEN r.is_visiting_venue THEN 'yes' ELSE 'no' END),
+        ('arrival_date', NULLIF(btrim(r.arrival_date), '')),
+        ('food_allergies', CASE
+            WHEN lower(btrim(COALESCE(r.food_allergies, '')))
+                 IN ('', 'none', 'n/a', 'na', 'no', 'ninguna', 'ninguno') THEN NULL
+            ELSE 'any'
+        END)
+    ) AS d(dimension, bucket)
+    WHERE d.bucket IS NOT NULL
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION rsvp_stats_apply(r rsvp_responses, delta INTEGER) RETURNS void AS $$
+    INSERT INTO rsvp_stats (dimension, bucket, responses, people)
+    SELECT b.dimension, b.bucket, delta, delta * r.household_count
+    FROM rsvp_stats_buckets(r) b
+    -- A fixed lock order keeps concurrent writers from deadlocking
+    ORDER BY b.dimension, b.bucket
+    ON CONFLICT (dimension, bucket) DO UPDATE
+        SET responses = rsvp_stats.responses + EXCLUDED.responses,
+            people = rsvp_stats.people + EXCLUDED.people;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION rsvp_stats_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM rsvp_stats;
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM rsvp_stats_apply(OLD, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM rsvp_stats_apply(NEW, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS rsvp_responses_stats ON rsvp_responses;
+CREATE TRIGGER rsvp_responses_stats
+    AFTER INSERT OR UPDATE OR DELETE ON rsvp_responses
+    FOR EACH ROW EXECUTE FUNCTION rsvp_stats_trigger();
+
+DROP TRIGGER IF EXISTS rsvp_responses_stats_truncate ON rsvp_responses;
+CREATE TRIGGER rsvp_responses_stats_truncate
+    AFTER TRUNCATE ON rsvp_responses
+    FOR EACH STATEMENT EXECUTE FUNCTION rsvp_stats_trigger();
+
+-- Recount the summary from scratch to reconcile any drift
+CREATE OR REPLACE FUNCTION rebuild_rsvp_stats() RETURNS void AS $$
+BEGIN
+    -- Keep writers out so no trigger deltas interleave with the recount
+    LOCK TABLE rsvp_responses IN SHARE MODE;
+    DELETE FROM rsvp_stats;
+    INSERT INTO rsvp_stats (dimension, bucket, responses, people)
+    SELECT b.dimension, b.bucket, count(*), sum(r.household_count)
+    FROM rsvp_responses r, rsvp_stats_buckets(r) b
+    GROUP BY b.dimension, b.bucket;
+    -- Cached /stats responses are keyed on the guest data version
+    UPDATE data_versions SET version = version + 1 WHERE name = 'guest_details';
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_rsvp_stats();
+
+COMMIT;
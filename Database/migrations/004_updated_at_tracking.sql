@@ -0,0 +1,29 @@
+-- Maintain and index updated_at for incremental backups.
+-- Apply to an existing database with:
+--   docker-compose exec -T db psql -U $POSTGRES_USER -d $POSTGRES_DB < Database/migrations/004_updated_at_tracking.sql
+BEGIN;
+
+
+-- Keep updated_at current on every change so incremental backups can pull
+-- only the rows modified since their last watermark
+CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS guests_set_updated_at ON guests;
+CREATE TRIGGER guests_set_updated_at
+    BEFORE UPDATE ON guests
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+DROP TRIGGER IF EXISTS rsvp_responses_set_updated_at ON rsvp_responses;
+CREATE TRIGGER rsvp_responses_set_updated_at
+    BEFORE UPDATE ON rsvp_responses
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+CREATE INDEX IF NOT EXISTS guests_updated_at_idx ON guests (updated_at);
+CREATE INDEX IF NOT EXISTS rsvp_responses_updated_at_idx ON rsvp_responses (updated_at);
+
+COMMIT;
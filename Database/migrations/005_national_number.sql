@@ -0,0 +1,15 @@
+-- Add the indexed national number used by GET /rsvp/{phone_number}.
+-- Apply to an existing database with:
+--   docker-compose exec -T db psql -U $POSTGRES_USER -d $POSTGRES_DB < Database/migrations/005_national_number.sql
+-- then fill in existing guests in batches with:
+--   python scripts/backfill_national_numbers.py
+BEGIN;
+
+-- phone_number holds the E.164 form (+<country code><national number>).
+-- National numbers are indexed separately so GET /rsvp/{phone_number} can
+-- find a guest typed without the country code with an index probe.
+ALTER TABLE guests ADD COLUMN IF NOT EXISTS national_number VARCHAR(20);
+
+CREATE INDEX IF NOT EXISTS guests_national_number_idx ON guests (national_number);
+
+COMMIT;
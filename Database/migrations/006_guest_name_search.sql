@@ -0,0 +1,19 @@
+-- Add the trigram index behind GET /guests/search.
+-- Apply to an existing database with:
+--   docker-compose exec -T db psql -U $POSTGRES_USER -d $POSTGRES_DB < Database/migrations/006_guest_name_search.sql
+BEGIN;
+
+-- Accent- and case-insensitive fuzzy name search for GET /guests/search.
+-- unaccent() is only STABLE (its dictionary can change), so an IMMUTABLE
+-- wrapper that pins the dictionary is needed to index its result.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text AS $$
+    SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+CREATE INDEX IF NOT EXISTS guests_full_name_trgm_idx
+    ON guests USING gin (lower(f_unaccent(full_name)) gin_trgm_ops);
+
+COMMIT;
@@ -0,0 +1,55 @@
+-- Add the change log and NOTIFY triggers behind GET /rsvp/stream.
+-- Apply to an existing database with:
+--   docker-compose exec -T db psql -U $POSTGRES_USER -d $POSTGRES_DB < Database/migrations/007_rsvp_change_feed.sql
+BEGIN;
+
+-- Change log behind GET /rsvp/stream. Every write to a guest or RSVP is
+-- recorded here and announced with NOTIFY carrying the change id, so the
+-- API can push it to open streams and replay it after a reconnect.
+CREATE TABLE IF NOT EXISTS rsvp_changes (
+    id BIGSERIAL PRIMARY KEY,
+    guest_id INTEGER,
+    table_name VARCHAR(20) NOT NULL,
+    operation VARCHAR(10) NOT NULL,
+    changed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS rsvp_changes_changed_at_idx ON rsvp_changes (changed_at);
+
+CREATE OR REPLACE FUNCTION record_rsvp_change() RETURNS trigger AS $$
+DECLARE
+    changed JSONB := to_jsonb(CASE WHEN TG_OP = 'DELETE' THEN OLD ELSE NEW END);
+    change_id BIGINT;
+BEGIN
+    -- Only guest columns the dashboards show are worth an event
+    IF TG_TABLE_NAME = 'guests' AND TG_OP = 'UPDATE' THEN
+        IF (OLD.full_name, OLD.phone_number, OLD.country_code)
+           IS NOT DISTINCT FROM (NEW.full_name, NEW.phone_number, NEW.country_code) THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+    INSERT INTO rsvp_changes (guest_id, table_name, operation)
+    VALUES (
+        CASE WHEN TG_TABLE_NAME = 'guests' THEN changed->>'id' ELSE changed->>'guest_id' END::INTEGER,
+        TG_TABLE_NAME,
+        TG_OP
+    )
+    RETURNING id INTO change_id;
+    -- Delivered on commit, and only if the transaction commits
+    PERFORM pg_notify('rsvp_changes', change_id::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS rsvp_responses_record_change ON rsvp_responses;
+CREATE TRIGGER rsvp_responses_record_change
+    AFTER INSERT OR UPDATE OR DELETE ON rsvp_responses
+    FOR EACH ROW EXECUTE FUNCTION record_rsvp_change();
+
+-- New guests are announced by their RSVP insert
+DROP TRIGGER IF EXISTS guests_record_change ON guests;
+CREATE TRIGGER guests_record_change
+    AFTER UPDATE OR DELETE ON guests
+    FOR EACH ROW EXECUTE FUNCTION record_rsvp_change();
+
+COMMIT;
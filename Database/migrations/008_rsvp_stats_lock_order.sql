@@ -0,0 +1,73 @@
+-- Keep rsvp_stats with statement-level triggers that apply the summed deltas
+-- of each statement in one upsert, locking ('total', 'all') first, so bulk
+-- upserts and single RSVPs changed at once cannot deadlock on the summary.
+-- Apply to an existing database with:
+--   docker-compose exec -T db psql -U $POSTGRES_USER -d $POSTGRES_DB < Database/migrations/008_rsvp_stats_lock_order.sql
+BEGIN;
+
+-- Apply the summed deltas of one statement's changes (rows removed, rows
+-- added; either may be NULL) in a single upsert. ('total', 'all') is locked
+-- first and the other buckets in (dimension, bucket) order. Every change
+-- counts towards the total, so a transaction holding any bucket lock holds
+-- the total too, and concurrent writers queue on it instead of deadlocking,
+-- even across the INSERT and UPDATE statements of one upsert.
+DROP FUNCTION IF EXISTS rsvp_stats_apply(rsvp_responses, INTEGER);
+DROP FUNCTION IF EXISTS rsvp_stats_apply(rsvp_responses, rsvp_responses);
+CREATE OR REPLACE FUNCTION rsvp_stats_apply(old_rows rsvp_responses[], new_rows rsvp_responses[])
+RETURNS void AS $$
+    INSERT INTO rsvp_stats (dimension, bucket, responses, people)
+    SELECT c.dimension, c.bucket, sum(c.responses), sum(c.people)
+    FROM (
+        SELECT b.dimension, b.bucket, -1 AS responses, -o.household_count AS people
+        FROM unnest(old_rows) o, rsvp_stats_buckets(o) b
+        UNION ALL
+        SELECT b.dimension, b.bucket, 1, n.household_count
+        FROM unnest(new_rows) n, rsvp_stats_buckets(n) b
+    ) c
+    GROUP BY c.dimension, c.bucket
+    -- The total is kept even when its deltas cancel out, for its lock
+    HAVING c.dimension = 'total' OR sum(c.responses) <> 0 OR sum(c.people) <> 0
+    ORDER BY c.dimension <> 'total', c.dimension, c.bucket
+    ON CONFLICT (dimension, bucket) DO UPDATE
+        SET responses = rsvp_stats.responses + EXCLUDED.responses,
+            people = rsvp_stats.people + EXCLUDED.people;
+$$ LANGUAGE sql;
+
+-- Statement-level, so a bulk upsert moves the counts once per statement
+-- rather than once per row
+CREATE OR REPLACE FUNCTION rsvp_stats_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM rsvp_stats;
+    ELSIF TG_OP = 'INSERT' THEN
+        PERFORM rsvp_stats_apply(NULL, ARRAY(SELECT n FROM new_rows n));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM rsvp_stats_apply(ARRAY(SELECT o FROM old_rows o), ARRAY(SELECT n FROM new_rows n));
+    ELSE
+        PERFORM rsvp_stats_apply(ARRAY(SELECT o FROM old_rows o), NULL);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow one event per trigger
+DROP TRIGGER IF EXISTS rsvp_responses_stats ON rsvp_responses;
+DROP TRIGGER IF EXISTS rsvp_responses_stats_insert ON rsvp_responses;
+CREATE TRIGGER rsvp_responses_stats_insert
+    AFTER INSERT ON rsvp_responses
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rsvp_stats_trigger();
+
+DROP TRIGGER IF EXISTS rsvp_responses_stats_update ON rsvp_responses;
+CREATE TRIGGER rsvp_responses_stats_update
+    AFTER UPDATE ON rsvp_responses
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rsvp_stats_trigger();
+
+DROP TRIGGER IF EXISTS rsvp_responses_stats_delete ON rsvp_responses;
+CREATE TRIGGER rsvp_responses_stats_delete
+    AFTER DELETE ON rsvp_responses
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rsvp_stats_trigger();
+
+COMMIT;
@@ -3,6 +3,7 @@ CREATE TABLE IF NOT EXISTS guests (
     id SERIAL PRIMARY KEY,
     full_name VARCHAR(100) NOT NULL,
     phone_number VARCHAR(20) UNIQUE NOT NULL,
+    national_number VARCHAR(20),
     country_code VARCHAR(5) NOT NULL,
     created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
@@ -10,7 +11,7 @@ CREATE TABLE IF NOT EXISTS guests (
 
 CREATE TABLE IF NOT EXISTS rsvp_responses (
     id SERIAL PRIMARY KEY,
-    guest_id INTEGER REFERENCES guests(id),
+    guest_id INTEGER UNIQUE REFERENCES guests(id),
     guest_relationship VARCHAR(10) NOT NULL,
     household_count INTEGER NOT NULL,
     food_allergies TEXT,
@@ -39,4 +40,235 @@ SELECT
     r.created_at as rsvp_created_at,
     r.updated_at as rsvp_updated_at
 FROM guests g
-LEFT JOIN rsvp_responses r ON g.id = r.guest_id; 
\ No newline at end of file
+LEFT JOIN rsvp_responses r ON g.id = r.guest_id; 
+
+-- Change counter for guest data. Triggers bump it inside every writing
+-- transaction so the API can answer conditional requests for guest details
+-- without re-reading the view.
+CREATE TABLE IF NOT EXISTS data_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO data_versions (name) VALUES ('guest_details') ON CONFLICT (name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_guest_data_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE name = 'guest_details';
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS guests_bump_data_version ON guests;
+CREATE TRIGGER guests_bump_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON guests
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_guest_data_version();
+
+DROP TRIGGER IF EXISTS rsvp_responses_bump_data_version ON rsvp_responses;
+CREATE TRIGGER rsvp_responses_bump_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON rsvp_responses
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_guest_data_version();
+
+-- Running RSVP totals kept up to date by triggers, so GET /stats reads a
+-- handful of rows instead of scanning every response
+CREATE TABLE IF NOT EXISTS rsvp_stats (
+    dimension VARCHAR(20) NOT NULL,
+    bucket VARCHAR(50) NOT NULL,
+    responses BIGINT NOT NULL DEFAULT 0,
+    people BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, bucket)
+);
+
+-- The summary buckets a single RSVP counts towards
+CREATE OR REPLACE FUNCTION rsvp_stats_buckets(r rsvp_responses)
+RETURNS TABLE (dimension TEXT, bucket TEXT) AS $$
+    SELECT d.dimension, d.bucket
+    FROM (VALUES
+        ('total', 'all'),
+        ('relationship', r.guest_relationship::text),
+        ('visiting_venue', CASE WHEN r.is_visiting_venue THEN 'yes' ELSE 'no' END),
+        ('arrival_date', NULLIF(btrim(r.arrival_date), '')),
+        ('food_allergies', CASE
+            WHEN lower(btrim(COALESCE(r.food_allergies, '')))
+                 IN ('', 'none', 'n/a', 'na', 'no', 'ninguna', 'ninguno') THEN NULL
+            ELSE 'any'
+        END)
+    ) AS d(dimension, bucket)
+    WHERE d.bucket IS NOT NULL
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Apply the summed deltas of one statement's changes (rows removed, rows
+-- added; either may be NULL) in a single upsert. ('total', 'all') is locked
+-- first and the other buckets in (dimension, bucket) order. Every change
+-- counts towards the total, so a transaction holding any bucket lock holds
+-- the total too, and concurrent writers queue on it instead of deadlocking,
+-- even across the INSERT and UPDATE statements of one upsert.
+DROP FUNCTION IF EXISTS rsvp_stats_apply(rsvp_responses, INTEGER);
+DROP FUNCTION IF EXISTS rsvp_stats_apply(rsvp_responses, rsvp_responses);
+CREATE OR REPLACE FUNCTION rsvp_stats_apply(old_rows rsvp_responses[], new_rows rsvp_responses[])
+RETURNS void AS $$
+    INSERT INTO rsvp_stats (dimension, bucket, responses, people)
+    SELECT c.dimension, c.bucket, sum(c.responses), sum(c.people)
+    FROM (
+        SELECT b.dimension, b.bucket, -1 AS responses, -o.household_count AS people
+        FROM unnest(old_rows) o, rsvp_stats_buckets(o) b
+        UNION ALL
+        SELECT b.dimension, b.bucket, 1, n.household_count
+        FROM unnest(new_rows) n, rsvp_stats_buckets(n) b
+    ) c
+    GROUP BY c.dimension, c.bucket
+    -- The total is kept even when its deltas cancel out, for its lock
+    HAVING c.dimension = 'total' OR sum(c.responses) <> 0 OR sum(c.people) <> 0
+    ORDER BY c.dimension <> 'total', c.dimension, c.bucket
+    ON CONFLICT (dimension, bucket) DO UPDATE
+        SET responses = rsvp_stats.responses + EXCLUDED.responses,
+            people = rsvp_stats.people + EXCLUDED.people;
+$$ LANGUAGE sql;
+
+-- Statement-level, so a bulk upsert moves the counts once per statement
+-- rather than once per row
+CREATE OR REPLACE FUNCTION rsvp_stats_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM rsvp_stats;
+    ELSIF TG_OP = 'INSERT' THEN
+        PERFORM rsvp_stats_apply(NULL, ARRAY(SELECT n FROM new_rows n));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM rsvp_stats_apply(ARRAY(SELECT o FROM old_rows o), ARRAY(SELECT n FROM new_rows n));
+    ELSE
+        PERFORM rsvp_stats_apply(ARRAY(SELECT o FROM old_rows o), NULL);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow one event per trigger
+DROP TRIGGER IF EXISTS rsvp_responses_stats ON rsvp_responses;
+DROP TRIGGER IF EXISTS rsvp_responses_stats_insert ON rsvp_responses;
+CREATE TRIGGER rsvp_responses_stats_insert
+    AFTER INSERT ON rsvp_responses
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rsvp_stats_trigger();
+
+DROP TRIGGER IF EXISTS rsvp_responses_stats_update ON rsvp_responses;
+CREATE TRIGGER rsvp_responses_stats_update
+    AFTER UPDATE ON rsvp_responses
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rsvp_stats_trigger();
+
+DROP TRIGGER IF EXISTS rsvp_responses_stats_delete ON rsvp_responses;
+CREATE TRIGGER rsvp_responses_stats_delete
+    AFTER DELETE ON rsvp_responses
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rsvp_stats_trigger();
+
+DROP TRIGGER IF EXISTS rsvp_responses_stats_truncate ON rsvp_responses;
+CREATE TRIGGER rsvp_responses_stats_truncate
+    AFTER TRUNCATE ON rsvp_responses
+    FOR EACH STATEMENT EXECUTE FUNCTION rsvp_stats_trigger();
+
+-- Recount the summary from scratch to reconcile any drift
+CREATE OR REPLACE FUNCTION rebuild_rsvp_stats() RETURNS void AS $$
+BEGIN
+    -- Keep writers out so no trigger deltas interleave with the recount
+    LOCK TABLE rsvp_responses IN SHARE MODE;
+    DELETE FROM rsvp_stats;
+    INSERT INTO rsvp_stats (dimension, bucket, responses, people)
+    SELECT b.dimension, b.bucket, count(*), sum(r.household_count)
+    FROM rsvp_responses r, rsvp_stats_buckets(r) b
+    GROUP BY b.dimension, b.bucket;
+    -- Cached /stats responses are keyed on the guest data version
+    UPDATE data_versions SET version = version + 1 WHERE name = 'guest_details';
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_rsvp_stats();
+
+-- Keep updated_at current on every change so incremental backups can pull
+-- only the rows modified since their last watermark
+CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS guests_set_updated_at ON guests;
+CREATE TRIGGER guests_set_updated_at
+    BEFORE UPDATE ON guests
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+DROP TRIGGER IF EXISTS rsvp_responses_set_updated_at ON rsvp_responses;
+CREATE TRIGGER rsvp_responses_set_updated_at
+    BEFORE UPDATE ON rsvp_responses
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+CREATE INDEX IF NOT EXISTS guests_updated_at_idx ON guests (updated_at);
+CREATE INDEX IF NOT EXISTS rsvp_responses_updated_at_idx ON rsvp_responses (updated_at);
+
+-- phone_number holds the E.164 form (+<country code><national number>).
+-- National numbers are indexed separately so GET /rsvp/{phone_number} can
+-- find a guest typed without the country code with an index probe.
+CREATE INDEX IF NOT EXISTS guests_national_number_idx ON guests (national_number);
+
+-- Accent- and case-insensitive fuzzy name search for GET /guests/search.
+-- unaccent() is only STABLE (its dictionary can change), so an IMMUTABLE
+-- wrapper that pins the dictionary is needed to index its result.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text AS $$
+    SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+CREATE INDEX IF NOT EXISTS guests_full_name_trgm_idx
+    ON guests USING gin (lower(f_unaccent(full_name)) gin_trgm_ops);
+
+-- Change log behind GET /rsvp/stream. Every write to a guest or RSVP is
+-- recorded here and announced with NOTIFY carrying the change id, so the
+-- API can push it to open streams and replay it after a reconnect.
+CREATE TABLE IF NOT EXISTS rsvp_changes (
+    id BIGSERIAL PRIMARY KEY,
+    guest_id INTEGER,
+    table_name VARCHAR(20) NOT NULL,
+    operation VARCHAR(10) NOT NULL,
+    changed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS rsvp_changes_changed_at_idx ON rsvp_changes (changed_at);
+
+CREATE OR REPLACE FUNCTION record_rsvp_change() RETURNS trigger AS $$
+DECLARE
+    changed JSONB := to_jsonb(CASE WHEN TG_OP = 'DELETE' THEN OLD ELSE NEW END);
+    change_id BIGINT;
+BEGIN
+    -- Only guest columns the dashboards show are worth an event
+    IF TG_TABLE_NAME = 'guests' AND TG_OP = 'UPDATE' THEN
+        IF (OLD.full_name, OLD.phone_number, OLD.country_code)
+           IS NOT DISTINCT FROM (NEW.full_name, NEW.phone_number, NEW.country_code) THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+    INSERT INTO rsvp_changes (guest_id, table_name, operation)
+    VALUES (
+        CASE WHEN TG_TABLE_NAME = 'guests' THEN changed->>'id' ELSE changed->>'guest_id' END::INTEGER,
+        TG_TABLE_NAME,
+        TG_OP
+    )
+    RETURNING id INTO change_id;
+    -- Delivered on commit, and only if the transaction commits
+    PERFORM pg_notify('rsvp_changes', change_id::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS rsvp_responses_record_change ON rsvp_responses;
+CREATE TRIGGER rsvp_responses_record_change
+    AFTER INSERT OR UPDATE OR DELETE ON rsvp_responses
+    FOR EACH ROW EXECUTE FUNCTION record_rsvp_change();
+
+-- New guests are announced by their RSVP insert
+DROP TRIGGER IF EXISTS guests_record_change ON guests;
+CREATE TRIGGER guests_record_change
+    AFTER UPDATE OR DELETE ON guests
+    FOR EACH ROW EXECUTE FUNCTION record_rsvp_change();
@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+RSVP_CACHE_URL = os.getenv("RSVP_CACHE_URL", "memory://")
+RSVP_CACHE_MAX_SIZE = int(os.getenv("RSVP_CACHE_MAX_SIZE", "10000"))
+RSVP_CACHE_TTL = float(os.getenv("RSVP_CACHE_TTL", "60"))
+
+
+class CacheBackend:
+    """Interface shared by the cache backends"""
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any) -> None:
+        raise NotImplementedError
+
+    def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache whose entries also expire after ``ttl`` seconds"""
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60.0):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class RedisCache(CacheBackend):
+    """Cache shared by every worker through a Redis-compatible server.
+
+    Values are stored as JSON with a server-side TTL; eviction is left to the
+    server's ``maxmemory-policy`` (use ``allkeys-lru``).
+    """
+
+    def __init__(self, url: str, ttl: float = 60.0, namespace: str = "cache"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError(f"The redis package is required for cache URL {url}")
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def get(self, key):
+        raw = self._client.get(self._key(key))
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value):
+        self._client.set(self._key(key), json.dumps(value), px=int(self.ttl * 1000))
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*(self._key(key) for key in keys))
+
+    def clear(self):
+        keys = list(self._client.scan_iter(match=self._key("*")))
+        if keys:
+            self._client.delete(*keys)
+
+    def stats(self):
+        info = self._client.info("stats")
+        with self._lock:
+            return {
+                "backend": "redis",
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": info.get("evicted_keys", 0),
+                "expirations": info.get("expired_keys", 0),
+            }
+
+
+def create_cache(url: str, max_size: int, ttl: float, namespace: str) -> CacheBackend:
+    """Build a cache backend from a ``memory://`` or ``redis://`` URL"""
+    scheme = urlparse(url).scheme
+    if scheme == "memory":
+        return MemoryCache(max_size=max_size, ttl=ttl)
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisCache(url, ttl=ttl, namespace=namespace)
+    raise ValueError(f"Unsupported cache URL scheme '{scheme}'")
+
+
+# Cached GET /rsvp/{phone_number} rows, keyed by normalized phone number
+rsvp_cache = create_cache(RSVP_CACHE_URL, RSVP_CACHE_MAX_SIZE, RSVP_CACHE_TTL, namespace="rsvp")
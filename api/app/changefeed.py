@@ -0,0 +1,219 @@
+import os
+import time
+import select
+import asyncio
+import threading
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from database import get_db
+from serialization import dumps
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Seconds between keep-alive comments on an idle stream
+RSVP_STREAM_HEARTBEAT = float(os.getenv("RSVP_STREAM_HEARTBEAT", "15"))
+RSVP_STREAM_MAX_SUBSCRIBERS = int(os.getenv("RSVP_STREAM_MAX_SUBSCRIBERS", "100"))
+# Changes replayed for a Last-Event-ID; further behind, the client is told to reload
+RSVP_STREAM_REPLAY_LIMIT = int(os.getenv("RSVP_STREAM_REPLAY_LIMIT", "1000"))
+RSVP_CHANGES_RETENTION_HOURS = float(os.getenv("RSVP_CHANGES_RETENTION_HOURS", "168"))
+
+# Filled by triggers on guests and rsvp_responses (see Database/schema.sql)
+CHANNEL = "rsvp_changes"
+# Events a slow subscriber may fall behind by before its stream is reset
+SUBSCRIBER_BACKLOG = 1000
+PRUNE_INTERVAL = 3600
+MAX_BACKOFF_SECONDS = 30
+
+CHANGES_SELECT = """
+    SELECT c.id, c.guest_id, c.table_name, c.operation, c.changed_at,
+           CASE WHEN d.guest_id IS NULL THEN NULL ELSE row_to_json(d) END AS guest
+    FROM rsvp_changes c
+    LEFT JOIN guest_rsvp_details d ON d.guest_id = c.guest_id
+"""
+CHANGES_BY_ID_SQL = "-- name: rsvp_changes_by_id\n" + CHANGES_SELECT + "WHERE c.id = ANY(%s) ORDER BY c.id"
+CHANGES_AFTER_SQL = "-- name: rsvp_changes_after\n" + CHANGES_SELECT + "WHERE c.id > %s ORDER BY c.id LIMIT %s"
+PRUNE_CHANGES_SQL = (
+    "-- name: prune_rsvp_changes\n"
+    "DELETE FROM rsvp_changes WHERE changed_at < NOW() - make_interval(hours => %s)"
+)
+
+RETRY = b"retry: 3000\n\n"
+KEEPALIVE = b": keepalive\n\n"
+# Sent when events were missed; the client should reload the guest list
+RESET = b"event: reset\ndata: {}\n\n"
+
+
+class TooManySubscribersError(Exception):
+    """Raised when the stream limit of this process is reached"""
+
+
+def change_event(row: Dict) -> Dict:
+    """Shape a change log row into the event sent to subscribers"""
+    return {
+        "id": row["id"],
+        "guestId": row["guest_id"],
+        "table": row["table_name"],
+        "operation": row["operation"],
+        "changedAt": row["changed_at"],
+        "guest": row["guest"],
+    }
+
+def format_event(event: Dict) -> bytes:
+    return b"id: %d\nevent: rsvp\ndata: %s\n\n" % (event["id"], dumps(event))
+
+def fetch_changes_after(cur, after: int, limit: int = RSVP_STREAM_REPLAY_LIMIT) -> Tuple[List[Dict], bool]:
+    """Changes logged after ``after``, and whether that was all of them"""
+    cur.execute(CHANGES_AFTER_SQL, (after, limit))
+    rows = cur.fetchall()
+    return [change_event(row) for row in rows], len(rows) < limit
+
+
+class Subscription:
+    def __init__(self):
+        self.events = deque()
+        self.wakeup = asyncio.Event()
+        self.overflowed = False
+
+
+class ChangeFeed:
+    """Fans changes announced with NOTIFY out to the SSE subscribers of this process.
+
+    A single listener thread holds one dedicated connection that LISTENs on
+    the change channel, loads each announced change once and hands it to the
+    event loop, which queues it for every subscriber. The thread starts with
+    the first subscriber, so a process nobody streams from opens nothing.
+    """
+
+    def __init__(self, heartbeat: float = RSVP_STREAM_HEARTBEAT,
+                 max_subscribers: int = RSVP_STREAM_MAX_SUBSCRIBERS):
+        self.heartbeat = heartbeat
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._loop = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self._last_id = None
+
+    def subscribe(self) -> Subscription:
+        """Reserve a stream slot; pass the subscription to ``stream``"""
+        if len(self._subscribers) >= self.max_subscribers:
+            raise TooManySubscribersError()
+        subscription = Subscription()
+        self._subscribers.add(subscription)
+        self._ensure_listener()
+        return subscription
+
+    def _ensure_listener(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._loop = asyncio.get_running_loop()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._listen, name="rsvp-changes", daemon=True)
+            self._thread.start()
+
+    def _dispatch(self, events: List[Dict]):
+        """Queue events for every subscriber; runs on the event loop"""
+        for subscription in self._subscribers:
+            if len(subscription.events) + len(events) > SUBSCRIBER_BACKLOG:
+                subscription.overflowed = True
+            else:
+                subscription.events.extend(events)
+            subscription.wakeup.set()
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    async def stream(self, subscription: Subscription,
+                     replay: Optional[Callable[[], Awaitable[Tuple[List[Dict], bool]]]] = None):
+        """Yield SSE messages: replayed changes first, then live ones as they happen"""
+        try:
+            yield RETRY
+            replayed = set()
+            if replay is not None:
+                # Subscribed first, so nothing committed meanwhile is lost
+                events, complete = await replay()
+                for event in events:
+                    replayed.add(event["id"])
+                    yield format_event(event)
+                if not complete:
+                    yield RESET
+                    return
+            while True:
+                try:
+                    await asyncio.wait_for(subscription.wakeup.wait(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE
+                    continue
+                subscription.wakeup.clear()
+                while subscription.events:
+                    event = subscription.events.popleft()
+                    if event["id"] not in replayed:
+                        yield format_event(event)
+                if subscription.overflowed:
+                    # Too far behind; the client reconnects and replays
+                    yield RESET
+                    return
+        finally:
+            self.unsubscribe(subscription)
+
+    def _publish(self, rows: List[Dict]):
+        if not rows:
+            return
+        events = [change_event(row) for row in rows]
+        self._last_id = max(self._last_id or 0, events[-1]["id"])
+        self._loop.call_soon_threadsafe(self._dispatch, events)
+
+    def _listen(self):
+        backoff = 1.0
+        next_prune = 0.0
+        while not self._stopping.is_set():
+            conn = None
+            try:
+                conn = get_db()
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {CHANNEL}")
+                    # Pick up what was announced while disconnected
+                    if self._last_id is not None:
+                        while True:
+                            cur.execute(CHANGES_AFTER_SQL, (self._last_id, RSVP_STREAM_REPLAY_LIMIT))
+                            rows = cur.fetchall()
+                            self._publish(rows)
+                            if len(rows) < RSVP_STREAM_REPLAY_LIMIT:
+                                break
+                backoff = 1.0
+                while not self._stopping.is_set():
+                    if time.monotonic() >= next_prune:
+                        with conn.cursor() as cur:
+                            cur.execute(PRUNE_CHANGES_SQL, (RSVP_CHANGES_RETENTION_HOURS,))
+                        next_prune = time.monotonic() + PRUNE_INTERVAL
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    ids = [int(notify.payload) for notify in conn.notifies if notify.payload.isdigit()]
+                    conn.notifies.clear()
+                    if ids:
+                        with conn.cursor() as cur:
+                            cur.execute(CHANGES_BY_ID_SQL, (ids,))
+                            self._publish(cur.fetchall())
+            except Exception as e:
+                logger.error("RSVP change listener failed, reconnecting in %.0fs: %s", backoff, e)
+                self._stopping.wait(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def stop(self, timeout: float = 5):
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+
+change_feed = ChangeFeed()
@@ -1,12 +1,17 @@
 import os
+import time
+import threading
+from collections import deque
 from dotenv import load_dotenv
 import psycopg2
+from psycopg2 import extensions
 from psycopg2.extras import RealDictCursor
 import logging
 from urllib.parse import urlparse
 
+from statements import StatementConnection
+
 # Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Load environment variables
@@ -17,7 +22,13 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set")
 
-logger.info(f"Connecting to database...")
+# Connection pool configuration
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))  # seconds to wait for a free connection
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "300"))  # retire connections idle longer than this
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "3600"))  # recycle connections older than this
+DB_POOL_CHECK_INTERVAL = float(os.getenv("DB_POOL_CHECK_INTERVAL", "30"))  # ping connections idle longer than this
 
 def get_db():
     try:
@@ -28,13 +39,247 @@ def get_db():
             user=url.username,
             password=url.password,
             host=url.hostname,
+            connection_factory=StatementConnection,
             cursor_factory=RealDictCursor
         )
-        logger.info("Successfully connected to the database")
+        logger.debug("Opened a new database connection")
         return conn
     except psycopg2.OperationalError as e:
-        logger.error(f"Could not connect to database: {str(e)}")
+        logger.error("Could not connect to database: %s", e)
         raise
     except Exception as e:
-        logger.error(f"Error connecting to database: {str(e)}")
-        raise 
\ No newline at end of file
+        logger.error("Error connecting to database: %s", e)
+        raise
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the pool timeout"""
+
+
+class _PoolEntry:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections.
+
+    Connections are handed out most-recently-used first so the warmest ones
+    are reused, pinged on checkout when they have been idle for a while, and
+    retired when broken, idle for too long or past their maximum lifetime.
+    Callers block for up to ``timeout`` seconds when the pool is exhausted.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=5.0,
+                 max_idle=300.0, max_lifetime=3600.0, check_interval=30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Invalid pool size: min_size must be between 0 and max_size")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check_interval = check_interval
+        self._idle = deque()
+        self._in_use = {}
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def getconn(self):
+        """Check out a healthy connection, waiting if the pool is exhausted"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            entry, expired = self._acquire_slot(deadline)
+            for stale in expired:
+                self._close_conn(stale.conn)
+            if entry is None:
+                entry = self._open_entry()
+            elif not self._is_healthy(entry):
+                self._discard(entry)
+                continue
+            with self._cond:
+                self._in_use[id(entry.conn)] = entry
+            return entry.conn
+
+    def putconn(self, conn, discard=False):
+        """Return a connection to the pool, closing it if it is no longer usable"""
+        with self._cond:
+            entry = self._in_use.pop(id(conn), None)
+        if entry is None:
+            raise ValueError("Connection does not belong to this pool")
+
+        if not discard and not conn.closed:
+            status = conn.get_transaction_status()
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                discard = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    discard = True
+
+        now = time.monotonic()
+        if discard or conn.closed or self._closed or now - entry.created_at > self.max_lifetime:
+            self._discard(entry)
+            return
+
+        entry.last_used = now
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    def fill(self):
+        """Open connections until the pool holds at least ``min_size``"""
+        opened = []
+        try:
+            while True:
+                with self._cond:
+                    if self._closed or self._size >= self.min_size:
+                        break
+                    self._size += 1
+                opened.append(self._open_entry())
+        finally:
+            # Connections opened before a failed connect still hold their slots
+            with self._cond:
+                closed = self._closed
+                if not closed:
+                    self._idle.extend(opened)
+                    self._cond.notify(len(opened))
+            if closed:
+                for entry in opened:
+                    self._discard(entry)
+        return len(opened)
+
+    def close(self):
+        """Close idle connections and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            self._close_conn(entry.conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            }
+
+    def _acquire_slot(self, deadline):
+        """Pop an idle entry or reserve room for a new connection.
+
+        Returns ``(entry, expired)`` where ``entry`` is ``None`` when the caller
+        should open a new connection, and ``expired`` lists idle entries that
+        were retired and must be closed outside the lock.
+        """
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError("Connection pool is closed")
+                expired = self._expire_idle()
+                if self._idle:
+                    return self._idle.pop(), expired
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None, expired
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f"No database connection available within {self.timeout}s "
+                        f"(pool size {self.max_size})"
+                    )
+                self._cond.wait(remaining)
+
+    def _expire_idle(self):
+        # Least recently used connections sit at the left of the deque
+        now = time.monotonic()
+        expired = []
+        while self._idle and self._size > self.min_size:
+            entry = self._idle[0]
+            if now - entry.last_used <= self.max_idle and now - entry.created_at <= self.max_lifetime:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            expired.append(entry)
+        return expired
+
+    def _open_entry(self):
+        try:
+            return _PoolEntry(self._connect())
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def _is_healthy(self, entry):
+        conn = entry.conn
+        if conn.closed:
+            return False
+        now = time.monotonic()
+        if now - entry.created_at > self.max_lifetime:
+            return False
+        if now - entry.last_used > self.check_interval:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error as e:
+                logger.warning("Discarding broken pooled connection: %s", e)
+                return False
+        return True
+
+    def _discard(self, entry):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        self._close_conn(entry.conn)
+
+    @staticmethod
+    def _close_conn(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    get_db,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    max_idle=DB_POOL_MAX_IDLE,
+                    max_lifetime=DB_POOL_MAX_LIFETIME,
+                    check_interval=DB_POOL_CHECK_INTERVAL,
+                )
+    return _pool
+
+def close_pool():
+    """Close the process-wide connection pool if it was created"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
@@ -0,0 +1,91 @@
+import io
+import os
+import csv
+import tempfile
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Sequence
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+EXPORT_FILE_CHUNK_BYTES = 64 * 1024
+
+EXPORT_FORMATS = ("csv", "xlsx")
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Columns of the guest_rsvp_details view, in spreadsheet order
+EXPORT_COLUMNS = [
+    "guest_id",
+    "full_name",
+    "phone_number",
+    "country_code",
+    "guest_relationship",
+    "household_count",
+    "food_allergies",
+    "is_visiting_venue",
+    "arrival_date",
+    "additional_notes",
+    "guest_created_at",
+    "guest_updated_at",
+    "rsvp_created_at",
+    "rsvp_updated_at",
+]
+
+
+def export_filename(fmt: str) -> str:
+    return f"guest-list-{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+
+def csv_chunks(columns: Sequence[str], row_chunks: Iterable[List[Sequence]]) -> Iterator[bytes]:
+    """Encode chunks of rows as CSV, yielding one byte string per chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in row_chunks:
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row]
+            for row in rows
+        )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def write_xlsx(columns: Sequence[str], row_chunks: Iterable[List[Sequence]], title: str = "Guests"):
+    """Write rows to a temporary XLSX file and return it rewound.
+
+    openpyxl's write-only mode flushes each row to disk as it is appended, so
+    memory stays flat regardless of the number of rows.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(list(columns))
+    for rows in row_chunks:
+        for row in rows:
+            sheet.append([_xlsx_value(value) for value in row])
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+def file_chunks(file, chunk_size: int = EXPORT_FILE_CHUNK_BYTES) -> Iterator[bytes]:
+    """Yield a file's contents in chunks and close it afterwards"""
+    try:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        file.close()
+
+def _xlsx_value(value):
+    # Excel has no notion of time zones, so store timestamps as naive UTC
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
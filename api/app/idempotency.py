@@ -0,0 +1,170 @@
+import os
+import json
+import base64
+import asyncio
+import hashlib
+import logging
+from typing import Dict, Iterable, Optional
+
+from cache import create_cache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Stored responses, keyed by Idempotency-Key. memory:// is per process;
+# redis:// lets a retry that reaches another worker be answered too.
+IDEMPOTENCY_CACHE_URL = os.getenv("IDEMPOTENCY_CACHE_URL", "memory://")
+IDEMPOTENCY_CACHE_MAX_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_MAX_SIZE", "10000"))
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+
+HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+
+idempotency_cache = create_cache(
+    IDEMPOTENCY_CACHE_URL, IDEMPOTENCY_CACHE_MAX_SIZE, IDEMPOTENCY_TTL, namespace="idempotency"
+)
+
+
+def fingerprint(method: str, path: str, body: bytes) -> str:
+    """Digest identifying the request a key was first used with"""
+    digest = hashlib.sha256(f"{method} {path}\n".encode("utf-8"))
+    digest.update(body)
+    return digest.hexdigest()
+
+def _cacheable(status: int) -> bool:
+    # Server errors and rate limit rejections may succeed when retried
+    return status < 500 and status != 429
+
+
+class IdempotencyMiddleware:
+    """Answer retried POSTs that carry an ``Idempotency-Key`` header from a cache.
+
+    The first request with a key runs normally and its response is stored
+    for ``IDEMPOTENCY_TTL`` seconds; repeats with the same body get that
+    response back (with ``Idempotent-Replayed: true``) without reaching the
+    handler, its rate limit or the database. Identical requests that arrive
+    while the first is still running wait for it instead of executing. A key
+    reused with a different body is rejected with 422.
+    """
+
+    def __init__(self, app, paths: Iterable[str], cache=idempotency_cache):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.cache = cache
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        key = dict(scope["headers"]).get(HEADER)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        key = key.decode("latin-1").strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, {"detail": f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"})
+            return
+
+        body = await _read_body(receive)
+        request_fingerprint = fingerprint(scope["method"], scope["path"], body)
+
+        # Identical requests already running are waited for instead of repeated
+        while True:
+            leader = self._in_flight.get(key)
+            if leader is None:
+                break
+            stored = await asyncio.shield(leader)
+            if stored is not None:
+                await _answer(send, stored, request_fingerprint)
+                return
+            # The running request's response was not stored (e.g. a server
+            # error), so this one tries again
+
+        # Registered before the cache lookup, so a request arriving meanwhile
+        # waits for this one rather than running too
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        stored = None
+        try:
+            stored = await self._lookup(key)
+            if stored is not None:
+                await _answer(send, stored, request_fingerprint)
+                return
+            stored = await self._run(scope, body, send, request_fingerprint)
+            if stored is not None:
+                await self._store(key, stored)
+        finally:
+            del self._in_flight[key]
+            future.set_result(stored)
+
+    async def _run(self, scope, body, send, request_fingerprint) -> Optional[Dict]:
+        """Call the app with the buffered body, capturing the response it sends"""
+        response = {"fingerprint": request_fingerprint, "status": 500, "headers": [], "body": b""}
+        chunks = []
+
+        async def replay_receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [
+                    [name.decode("latin-1"), value.decode("latin-1")]
+                    for name, value in message.get("headers", [])
+                ]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, replay_receive, capture_send)
+        if not _cacheable(response["status"]):
+            return None
+        response["body"] = base64.b64encode(b"".join(chunks)).decode("ascii")
+        return response
+
+    async def _lookup(self, key: str) -> Optional[Dict]:
+        try:
+            return await asyncio.to_thread(self.cache.get, key)
+        except Exception as e:
+            logger.warning("Idempotency cache lookup failed: %s", e)
+            return None
+
+    async def _store(self, key: str, stored: Dict):
+        try:
+            await asyncio.to_thread(self.cache.set, key, stored)
+        except Exception as e:
+            logger.warning("Idempotency cache store failed: %s", e)
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+async def _answer(send, stored: Dict, request_fingerprint: str):
+    if stored["fingerprint"] != request_fingerprint:
+        await _send_json(send, 422, {"detail": "Idempotency-Key was already used with a different request"})
+        return
+    await _replay(send, stored)
+
+async def _replay(send, stored: Dict):
+    headers = [
+        (name.encode("latin-1"), value.encode("latin-1"))
+        for name, value in stored["headers"]
+    ]
+    headers.append((b"idempotent-replayed", b"true"))
+    await send({"type": "http.response.start", "status": stored["status"], "headers": headers})
+    await send({"type": "http.response.body", "body": base64.b64decode(stored["body"])})
+
+async def _send_json(send, status: int, content: Dict):
+    body = json.dumps(content).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,303 @@
+import io
+import os
+import csv
+import json
+import logging
+from typing import Dict, Iterable, Iterator, List, Tuple
+from psycopg2.extras import execute_values
+from pydantic import ValidationError
+
+from models import RSVPRequest
+from utils import sanitize_phone, normalize_phone, rsvp_cache_keys, get_db_cursor
+from cache import rsvp_cache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+
+IMPORT_FORMATS = ("csv", "xlsx", "ndjson")
+
+CONTENT_TYPE_FORMATS = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "xlsx",
+}
+
+# Spreadsheets may use the database column names instead of the API field names
+FIELD_ALIASES = {
+    "full_name": "fullName",
+    "phone_number": "phoneNumber",
+    "country_code": "countryCode",
+    "relationship": "guest_relationship",
+    "household_count": "householdCount",
+    "food_allergies": "foodAllergies",
+    "is_visiting_venue": "isVisitingVenue",
+    "arrival_date": "arrivalDate",
+    "additional_notes": "additionalNotes",
+}
+
+# Upserts a whole batch in one statement, mirroring the single-row upsert used
+# by POST /rsvp/. Rows must have unique phone numbers within the batch.
+# Returns one row per RSVP with the guest's phone number.
+BULK_UPSERT_SQL = """
+    -- name: bulk_upsert_rsvp
+    WITH rows (
+        full_name, phone_number, national_number, country_code, guest_relationship,
+        household_count, food_allergies, is_visiting_venue, arrival_date, additional_notes
+    ) AS (
+        VALUES %s
+    ), guest AS (
+        INSERT INTO guests (full_name, phone_number, national_number, country_code)
+        SELECT full_name, phone_number, national_number, country_code FROM rows
+        ON CONFLICT (phone_number) DO UPDATE
+            SET national_number = EXCLUDED.national_number
+        RETURNING id, phone_number
+    ), rsvp AS (
+        INSERT INTO rsvp_responses (
+            guest_id, guest_relationship, household_count, food_allergies,
+            is_visiting_venue, arrival_date, additional_notes
+        )
+        SELECT g.id, r.guest_relationship, r.household_count, r.food_allergies,
+               r.is_visiting_venue, r.arrival_date, r.additional_notes
+        FROM rows r
+        JOIN guest g ON g.phone_number = r.phone_number
+        ON CONFLICT (guest_id) DO UPDATE
+            SET guest_relationship = EXCLUDED.guest_relationship,
+                household_count = EXCLUDED.household_count,
+                food_allergies = EXCLUDED.food_allergies,
+                is_visiting_venue = EXCLUDED.is_visiting_venue,
+                arrival_date = EXCLUDED.arrival_date,
+                additional_notes = EXCLUDED.additional_notes,
+                updated_at = NOW()
+        RETURNING id, guest_id, (xmax = 0) AS inserted
+    )
+    SELECT g.phone_number, r.id, r.inserted
+    FROM rsvp r
+    JOIN guest g ON g.id = r.guest_id
+"""
+
+BULK_UPSERT_TEMPLATE = (
+    "(%s::varchar, %s::varchar, %s::varchar, %s::varchar, %s::varchar,"
+    " %s::integer, %s::text, %s::boolean, %s::varchar, %s::text)"
+)
+
+
+class ImportFormatError(ValueError):
+    """Raised when an uploaded file cannot be parsed"""
+
+
+def detect_format(content_type: str) -> str:
+    """Map a request Content-Type to an import format"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    fmt = CONTENT_TYPE_FORMATS.get(media_type)
+    if fmt is None:
+        raise ImportFormatError(
+            f"Unsupported content type '{media_type}', expected one of: "
+            + ", ".join(sorted(CONTENT_TYPE_FORMATS))
+        )
+    return fmt
+
+def parse_rows(data: bytes, fmt: str) -> Iterator[Tuple[int, Dict]]:
+    """Yield ``(row_number, raw_row)`` pairs from an uploaded file"""
+    if fmt == "csv":
+        return _parse_csv(data)
+    if fmt == "ndjson":
+        return _parse_ndjson(data)
+    if fmt == "xlsx":
+        return _parse_xlsx(data)
+    raise ImportFormatError(f"Unsupported format '{fmt}', expected one of: {', '.join(IMPORT_FORMATS)}")
+
+def _parse_csv(data: bytes):
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ImportFormatError("CSV files must be UTF-8 encoded")
+    reader = csv.DictReader(io.StringIO(text, newline=""))
+    # Row 1 is the header, so data rows are numbered as a spreadsheet shows them
+    for row_number, row in enumerate(reader, start=2):
+        yield row_number, row
+
+def _parse_ndjson(data: bytes):
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        raise ImportFormatError("NDJSON files must be UTF-8 encoded")
+    for row_number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            row = {"__error__": f"Invalid JSON: {e.msg}"}
+        if not isinstance(row, dict):
+            row = {"__error__": "Each line must be a JSON object"}
+        yield row_number, row
+
+def _parse_xlsx(data: bytes):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError("XLSX import requires the openpyxl package")
+    try:
+        workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFormatError(f"Could not read XLSX file: {str(e)}")
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name).strip() if name is not None else "" for name in header]
+        for row_number, values in enumerate(rows, start=2):
+            if all(value is None for value in values):
+                continue
+            yield row_number, dict(zip(columns, (_cell_to_str(value) for value in values)))
+    finally:
+        workbook.close()
+
+def _cell_to_str(value):
+    # Spreadsheets store phone numbers and counts as numbers
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+def normalize_row(raw: Dict) -> Dict:
+    """Rename aliased columns, blank cells to None and tidy phone fields"""
+    row = {}
+    for key, value in raw.items():
+        if key is None:
+            continue
+        key = key.strip()
+        key = FIELD_ALIASES.get(key, key)
+        if isinstance(value, str):
+            value = value.strip()
+            if value == "":
+                value = None
+        row[key] = value
+    phone = row.get("phoneNumber")
+    if isinstance(phone, str):
+        row["phoneNumber"] = sanitize_phone(phone)
+    country_code = row.get("countryCode")
+    if isinstance(country_code, str) and not country_code.startswith("+"):
+        row["countryCode"] = f"+{country_code}"
+    return row
+
+def validate_batch(rows: Iterable[Tuple[int, Dict]]):
+    """Validate raw rows against RSVPRequest.
+
+    Returns the valid ``(row_number, RSVPRequest)`` pairs (one per phone
+    number, the last occurrence wins), a list of per-row error reports and
+    the rows replaced by a later row with the same phone number.
+    """
+    valid = {}
+    errors = []
+    superseded = []
+    for row_number, raw in rows:
+        if "__error__" in raw:
+            errors.append({"row": row_number, "errors": [raw["__error__"]]})
+            continue
+        try:
+            rsvp_request = RSVPRequest(**normalize_row(raw))
+        except ValidationError as e:
+            errors.append({
+                "row": row_number,
+                "errors": [
+                    f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+                    for err in e.errors()
+                ]
+            })
+            continue
+        full_phone, _ = normalize_phone(rsvp_request.countryCode, rsvp_request.phoneNumber)
+        previous = valid.pop(full_phone, None)
+        if previous is not None:
+            superseded.append({"row": previous[0], "supersededBy": row_number})
+        valid[full_phone] = (row_number, rsvp_request)
+    return list(valid.values()), errors, superseded
+
+def upsert_rsvps(cur, rsvp_requests: List[RSVPRequest]) -> Dict[str, Dict]:
+    """Upsert RSVPs with distinct phone numbers in one statement.
+
+    Returns the ``id`` and ``inserted`` flag of each RSVP keyed by the
+    guest's E.164 phone number.
+    """
+    values = [
+        (
+            rsvp_request.fullName,
+            *normalize_phone(rsvp_request.countryCode, rsvp_request.phoneNumber),
+            rsvp_request.countryCode,
+            rsvp_request.guest_relationship,
+            rsvp_request.householdCount,
+            rsvp_request.foodAllergies,
+            rsvp_request.isVisitingVenue,
+            rsvp_request.arrivalDate,
+            rsvp_request.additionalNotes,
+        )
+        for rsvp_request in rsvp_requests
+    ]
+    results = execute_values(
+        cur, BULK_UPSERT_SQL, values,
+        template=BULK_UPSERT_TEMPLATE, page_size=len(values), fetch=True
+    )
+    return {row["phone_number"]: row for row in results}
+
+def load_batch(cur, batch: List[Tuple[int, RSVPRequest]]) -> Tuple[int, int]:
+    """Upsert a validated batch, returning ``(inserted, updated)`` counts"""
+    results = upsert_rsvps(cur, [rsvp_request for _, rsvp_request in batch])
+    inserted = sum(1 for row in results.values() if row["inserted"])
+    return inserted, len(results) - inserted
+
+def _batches(rows: Iterator, size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def import_rows(rows: Iterator[Tuple[int, Dict]], batch_size: int = IMPORT_BATCH_SIZE) -> Dict:
+    """Validate and load rows batch by batch, one transaction per batch"""
+    report = {"total": 0, "inserted": 0, "updated": 0, "failed": 0, "errors": [], "superseded": []}
+    for raw_batch in _batches(rows, batch_size):
+        report["total"] += len(raw_batch)
+        batch, errors, superseded = validate_batch(raw_batch)
+        report["errors"].extend(errors)
+        report["superseded"].extend(superseded)
+        if not batch:
+            continue
+        try:
+            with get_db_cursor() as cur:
+                inserted, updated = load_batch(cur, batch)
+        except Exception as e:
+            logger.error("Failed to load import batch: %s", e)
+            report["errors"].extend(
+                {"row": row_number, "errors": [f"Database error: {str(e)}"]}
+                for row_number, _ in batch
+            )
+            continue
+        report["inserted"] += inserted
+        report["updated"] += updated
+        rsvp_cache.delete(*{
+            key
+            for _, rsvp_request in batch
+            for key in rsvp_cache_keys(
+                *normalize_phone(rsvp_request.countryCode, rsvp_request.phoneNumber)
+            )
+        })
+    report["errors"].sort(key=lambda error: error["row"])
+    report["superseded"].sort(key=lambda row: row["row"])
+    # Superseded rows are not failures: a later row for the same guest was loaded
+    report["failed"] = len(report["errors"])
+    logger.info(
+        "Imported %d of %d rows (%d failed, %d superseded)",
+        report["inserted"] + report["updated"], report["total"], report["failed"],
+        len(report["superseded"])
+    )
+    return report
@@ -0,0 +1,160 @@
+import os
+import re
+import sys
+import time
+import queue
+import atexit
+import random
+import logging
+import threading
+import contextvars
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Fraction of successful requests that get a summary line; errors and slow
+# requests are always logged
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+LOG_SLOW_REQUEST_MS = float(os.getenv("LOG_SLOW_REQUEST_MS", "1000"))
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Runs of seven or more digits, optionally with a leading + and the usual
+# separators, i.e. anything that looks like a phone number
+_PHONE_PATTERN = re.compile(r"(?<![\w.])\+?\d(?:[\s().-]{0,2}\d){6,}")
+
+logger = logging.getLogger("api.requests")
+
+_listener = None
+_listener_lock = threading.Lock()
+
+# Per-request database timings, shared with the executor threads through the
+# copied context
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def redact(text: str) -> str:
+    """Mask phone numbers in a log message"""
+    return _PHONE_PATTERN.sub("[redacted]", text)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queue the record untouched; the listener thread does the formatting"""
+
+    def prepare(self, record):
+        return record
+
+
+class RedactingFormatter(logging.Formatter):
+    def formatMessage(self, record):
+        record.message = redact(record.message)
+        return super().formatMessage(record)
+
+    def formatException(self, ei):
+        return redact(super().formatException(ei))
+
+
+def configure_logging(level: str = LOG_LEVEL):
+    """Route every log record through a queue to a background writer thread.
+
+    Callers only enqueue the record; message formatting, phone number
+    redaction and the write to stderr happen on the listener thread.
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+        record_queue = queue.SimpleQueue()
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(RedactingFormatter(LOG_FORMAT))
+        _listener = QueueListener(record_queue, handler, respect_handler_level=True)
+        _listener.start()
+
+        root = logging.getLogger()
+        root.setLevel(level)
+        for existing in [h for h in root.handlers if isinstance(h, _DeferredQueueHandler)]:
+            root.removeHandler(existing)
+        root.addHandler(_DeferredQueueHandler(record_queue))
+    atexit.unregister(stop_logging)
+    atexit.register(stop_logging)
+
+def _restart_after_fork():
+    # Threads do not survive fork, so a preloaded gunicorn worker needs its
+    # own listener for the records its inherited QueueHandler enqueues
+    global _listener, _listener_lock
+    _listener_lock = threading.Lock()
+    if _listener is not None:
+        _listener = None
+        configure_logging()
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+class RequestTimings:
+    __slots__ = ("queries", "query_seconds", "acquire_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.acquire_seconds = 0.0
+
+
+def add_query_time(seconds: float):
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.queries += 1
+        timings.query_seconds += seconds
+
+def add_acquire_time(seconds: float):
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.acquire_seconds += seconds
+
+
+def _route(scope):
+    # The route template, never the raw path, which may contain a phone number
+    return getattr(scope.get("route"), "path", None) or "unmatched"
+
+
+class RequestLogMiddleware:
+    """ASGI middleware writing one summary line per request"""
+
+    def __init__(self, app, sample_rate: float = LOG_SAMPLE_RATE, slow_ms: float = LOG_SLOW_REQUEST_MS):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_timings.reset(token)
+            duration_ms = (time.perf_counter() - started) * 1000
+            if status >= 400 or duration_ms >= self.slow_ms or random.random() < self.sample_rate:
+                logger.log(
+                    logging.WARNING if status >= 500 else logging.INFO,
+                    "method=%s route=%s status=%d duration_ms=%.1f db_ms=%.1f queries=%d acquire_ms=%.1f",
+                    scope["method"], _route(scope), status, duration_ms,
+                    timings.query_seconds * 1000, timings.queries, timings.acquire_seconds * 1000
+                )
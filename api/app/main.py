@@ -1,29 +1,96 @@
-from fastapi import FastAPI, HTTPException, Request
+import time
+# Start of the import phase reported as api_startup_seconds{phase="import"}
+_import_started = time.perf_counter()
+
+import os
+import asyncio
+from typing import Optional
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.exceptions import RequestValidationError
+from contextlib import asynccontextmanager
 import logging
 
+from logging_config import configure_logging, RequestLogMiddleware
 from models import RSVPRequest, RSVPResponse
-from utils import sanitize_phone, get_db_cursor
+from serialization import FastJSONResponse, dumps_lines, rsvp_response_content
+from utils import (
+    normalize_phone, phone_lookup_key, rsvp_cache_keys, get_db_cursor, run_db,
+    iterate_in_db_executor, shutdown_db_executor
+)
+from database import PoolTimeoutError, close_pool, get_pool
+import metrics
+import statements
+import ratelimit_storage  # registers the sqlite:// rate limit storage
+from security import require_admin
+from cache import rsvp_cache
+from idempotency import IdempotencyMiddleware
+from rsvp_queue import rsvp_queue
+from changefeed import TooManySubscribersError, change_feed, fetch_changes_after
+from startup import warmup
+from stats import STATS, REBUILD_STATS_SQL, summarize_stats, stats_drift
+from snapshot import (
+    GUEST_DATA_VERSION, guest_details_snapshots, build_snapshot, make_etag,
+    etag_matches, not_modified_response, snapshot_response
+)
+from search import (
+    GUEST_SEARCH_PAGE_SIZE, GUEST_SEARCH_MAX_PAGE_SIZE, GUEST_SEARCH_SQL, search_params, search_page
+)
+from importer import ImportFormatError, detect_format, parse_rows, import_rows
+from export import (
+    EXPORT_CHUNK_ROWS, EXPORT_COLUMNS, EXPORT_MEDIA_TYPES,
+    csv_chunks, export_filename, file_chunks, write_xlsx
+)
+
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(20 * 1024 * 1024)))
+GUEST_DETAILS_PAGE_SIZE = int(os.getenv("GUEST_DETAILS_PAGE_SIZE", "100"))
+GUEST_DETAILS_MAX_PAGE_SIZE = int(os.getenv("GUEST_DETAILS_MAX_PAGE_SIZE", "1000"))
+GUEST_DETAILS_STREAM_CHUNK = int(os.getenv("GUEST_DETAILS_STREAM_CHUNK", "500"))
+
+# Limits for RSVP submissions and for lookups, in the limits library's
+# notation. Counters live in RATE_LIMIT_STORAGE_URI: memory:// is per
+# process, so run several workers with sqlite:///<file> or redis://.
+RATE_LIMIT = os.getenv("RATE_LIMIT", "5/minute")
+RATE_LIMIT_LOOKUP = os.getenv("RATE_LIMIT_LOOKUP", "10/minute")
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Create limiter instance
-limiter = Limiter(key_func=get_remote_address)
+limiter = Limiter(key_func=get_remote_address, storage_uri=RATE_LIMIT_STORAGE_URI)
 
-app = FastAPI(title="Wedding RSVP API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if rsvp_queue is not None:
+        rsvp_queue.start()
+    # Serve /healthz at once; /readyz passes when the warm-up is done
+    warming = asyncio.create_task(warmup.run())
+    yield
+    warming.cancel()
+    if rsvp_queue is not None:
+        rsvp_queue.stop()
+    change_feed.stop()
+    shutdown_db_executor()
+    close_pool()
+
+app = FastAPI(title="Wedding RSVP API", lifespan=lifespan)
+
+def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    metrics.rate_limit_rejections.inc(route=metrics.route_label(request.scope))
+    return _rate_limit_exceeded_handler(request, exc)
 
 # Add rate limiter error handler
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
 
 # Global exception handlers
 @app.exception_handler(HTTPException)
@@ -40,14 +107,39 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         content={"detail": {"message": str(exc)}}
     )
 
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_exception_handler(request: Request, exc: PoolTimeoutError):
+    logger.error("Database pool exhausted: %s", exc)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": {"message": "Server is busy, please try again shortly"}},
+        headers={"Retry-After": "1"}
+    )
+
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Unhandled exception: {str(exc)}")
+    logger.error("Unhandled exception: %s", exc, exc_info=exc)
     return JSONResponse(
         status_code=500,
         content={"detail": {"message": "Internal server error"}}
     )
 
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that passes the responses of ``exclude_paths`` through untouched"""
+
+    def __init__(self, app, exclude_paths=(), **kwargs):
+        super().__init__(app, **kwargs)
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+# Innermost, so replayed responses still pass through CORS and compression
+app.add_middleware(IdempotencyMiddleware, paths=["/rsvp/"])
+
 # Add security middleware
 app.add_middleware(
     CORSMiddleware,
@@ -58,228 +150,535 @@ app.add_middleware(
 )
 
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])  # Update with your domains
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# GZipMiddleware only flushes its compressor at the end of a body, which
+# would hold Server-Sent Events back until the stream closes
+app.add_middleware(SelectiveGZipMiddleware, minimum_size=1000, exclude_paths=["/rsvp/stream"])
+app.add_middleware(RequestLogMiddleware)
+# Outermost, so requests rejected by the other middleware are counted too
+app.add_middleware(metrics.MetricsMiddleware)
 
 
-@app.post("/rsvp/", response_model=RSVPResponse)
-@limiter.limit("5/minute")
+# Upserts the guest (keyed by phone number) and their single RSVP in one round
+# trip. The no-op update on guests locks an existing guest row so concurrent
+# submits for one phone serialize, and xmax = 0 marks freshly inserted RSVPs.
+UPSERT_RSVP_SQL = """
+    -- name: upsert_rsvp
+    WITH guest AS (
+        INSERT INTO guests (full_name, phone_number, national_number, country_code)
+        VALUES (%(full_name)s, %(phone_number)s, %(national_number)s, %(country_code)s)
+        ON CONFLICT (phone_number) DO UPDATE
+            SET national_number = EXCLUDED.national_number
+        RETURNING id, full_name, phone_number, country_code
+    ), rsvp AS (
+        INSERT INTO rsvp_responses (
+            guest_id, guest_relationship, household_count, food_allergies,
+            is_visiting_venue, arrival_date, additional_notes
+        )
+        SELECT id, %(guest_relationship)s::varchar, %(household_count)s::integer,
+               %(food_allergies)s::text, %(is_visiting_venue)s::boolean,
+               %(arrival_date)s::varchar, %(additional_notes)s::text
+        FROM guest
+        ON CONFLICT (guest_id) DO UPDATE
+            SET guest_relationship = EXCLUDED.guest_relationship,
+                household_count = EXCLUDED.household_count,
+                food_allergies = EXCLUDED.food_allergies,
+                is_visiting_venue = EXCLUDED.is_visiting_venue,
+                arrival_date = EXCLUDED.arrival_date,
+                additional_notes = EXCLUDED.additional_notes,
+                updated_at = NOW()
+        RETURNING id, guest_id, guest_relationship, household_count, food_allergies,
+                  is_visiting_venue, arrival_date, additional_notes, (xmax = 0) AS inserted
+    )
+    SELECT r.id, g.full_name, g.phone_number, g.country_code,
+           r.guest_relationship, r.household_count, r.food_allergies,
+           r.is_visiting_venue, r.arrival_date, r.additional_notes,
+           NOT r.inserted AS was_updated
+    FROM rsvp r
+    JOIN guest g ON g.id = r.guest_id
+"""
+UPSERT_RSVP = statements.register(UPSERT_RSVP_SQL)
+
+def _save_rsvp(rsvp_request: RSVPRequest, full_phone: str, national_number: str):
+    """Create or update the guest and RSVP rows in a single statement"""
+    with get_db_cursor() as cur:
+        statements.execute(
+            cur,
+            UPSERT_RSVP,
+            {
+                "full_name": rsvp_request.fullName,
+                "phone_number": full_phone,
+                "national_number": national_number,
+                "country_code": rsvp_request.countryCode,
+                "guest_relationship": rsvp_request.guest_relationship,
+                "household_count": rsvp_request.householdCount,
+                "food_allergies": rsvp_request.foodAllergies,
+                "is_visiting_venue": rsvp_request.isVisitingVenue,
+                "arrival_date": rsvp_request.arrivalDate,
+                "additional_notes": rsvp_request.additionalNotes,
+            }
+        )
+        result = cur.fetchone()
+        if not result:
+            raise HTTPException(
+                status_code=500,
+                detail="Failed to create/update RSVP record"
+            )
+        logger.debug("Saved RSVP %s (updated: %s)", result['id'], result['was_updated'])
+
+    # Drop cached lookups only after the transaction has committed
+    rsvp_cache.delete(*rsvp_cache_keys(full_phone, national_number))
+    return rsvp_response_content(result)
+
+@app.post(
+    "/rsvp/", response_model=RSVPResponse,
+    responses={202: {"description": "Queued for writing; poll GET /rsvp/status/{token}"}}
+)
+@limiter.limit(RATE_LIMIT)
 async def create_rsvp(request: Request, rsvp_request: RSVPRequest):
-    logger.info(f"Received RSVP request: {rsvp_request}")
     try:
-        # Sanitize phone number
-        clean_phone = sanitize_phone(rsvp_request.phoneNumber)
-        full_phone = f"{rsvp_request.countryCode}{clean_phone}"
-        logger.info(f"Processing RSVP for phone number: {full_phone}")
-        
-        with get_db_cursor() as cur:
-            # Check if guest already exists by phone number
-            cur.execute(
-                "SELECT id FROM guests WHERE phone_number = %s",
-                (full_phone,)
-            )
-            existing_guest = cur.fetchone()
-            logger.info(f"Existing guest check result: {existing_guest}")
-
-            if existing_guest:
-                guest_id = existing_guest['id']
-                logger.info(f"Found existing guest with ID: {guest_id}")
-            else:
-                # Create new guest
-                cur.execute(
-                    """
-                    INSERT INTO guests (full_name, phone_number, country_code)
-                    VALUES (%s, %s, %s)
-                    RETURNING id, full_name, phone_number, country_code, created_at, updated_at
-                    """,
-                    (rsvp_request.fullName, full_phone, rsvp_request.countryCode)
-                )
-                guest = cur.fetchone()
-                if not guest:
-                    raise HTTPException(
-                        status_code=500,
-                        detail="Failed to create guest record"
-                    )
-                guest_id = guest['id']
-                logger.info(f"Created new guest with ID: {guest_id}")
-
-            # Check for existing RSVP
-            cur.execute(
-                "SELECT id FROM rsvp_responses WHERE guest_id = %s",
-                (guest_id,)
-            )
-            existing_rsvp = cur.fetchone()
-            was_updated = bool(existing_rsvp)
-            logger.info(f"Existing RSVP check result: {existing_rsvp}")
-
-            if existing_rsvp:
-                # Update existing RSVP
-                cur.execute(
-                    """
-                    UPDATE rsvp_responses
-                    SET guest_relationship = %s,
-                        household_count = %s,
-                        food_allergies = %s,
-                        is_visiting_venue = %s,
-                        arrival_date = %s,
-                        additional_notes = %s,
-                        updated_at = NOW()
-                    WHERE guest_id = %s
-                    RETURNING id, guest_id, guest_relationship, household_count, food_allergies,
-                              is_visiting_venue, arrival_date, additional_notes, created_at, updated_at
-                    """,
-                    (
-                        rsvp_request.guest_relationship,
-                        rsvp_request.householdCount,
-                        rsvp_request.foodAllergies,
-                        rsvp_request.isVisitingVenue,
-                        rsvp_request.arrivalDate,
-                        rsvp_request.additionalNotes,
-                        guest_id
-                    )
-                )
-            else:
-                # Create new RSVP
-                cur.execute(
-                    """
-                    INSERT INTO rsvp_responses (
-                        guest_id, guest_relationship, household_count, food_allergies,
-                        is_visiting_venue, arrival_date, additional_notes
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id, guest_id, guest_relationship, household_count, food_allergies,
-                              is_visiting_venue, arrival_date, additional_notes, created_at, updated_at
-                    """,
-                    (
-                        guest_id,
-                        rsvp_request.guest_relationship,
-                        rsvp_request.householdCount,
-                        rsvp_request.foodAllergies,
-                        rsvp_request.isVisitingVenue,
-                        rsvp_request.arrivalDate,
-                        rsvp_request.additionalNotes
-                    )
-                )
-
-            rsvp = cur.fetchone()
-            if not rsvp:
-                raise HTTPException(
-                    status_code=500,
-                    detail="Failed to create/update RSVP record"
-                )
-
-            # Get guest details for response
-            cur.execute(
-                """
-                SELECT g.full_name, g.phone_number, g.country_code,
-                       r.guest_relationship, r.household_count, r.food_allergies,
-                       r.is_visiting_venue, r.arrival_date, r.additional_notes
-                FROM guests g
-                JOIN rsvp_responses r ON r.guest_id = g.id
-                WHERE g.id = %s
-                """,
-                (guest_id,)
-            )
-            result = cur.fetchone()
-
-            return RSVPResponse(
-                id=rsvp['id'],
-                fullName=result['full_name'],
-                phoneNumber=result['phone_number'],
-                countryCode=result['country_code'],
-                guest_relationship=result['guest_relationship'],
-                householdCount=result['household_count'],
-                foodAllergies=result['food_allergies'],
-                isVisitingVenue=result['is_visiting_venue'],
-                arrivalDate=result['arrival_date'],
-                additionalNotes=result['additional_notes'],
-                wasUpdated=was_updated
-            )
+        if rsvp_queue is not None:
+            # Acknowledge once the submission is durably queued
+            token = await run_db(rsvp_queue.enqueue, rsvp_request)
+            return FastJSONResponse({"token": token, "status": "pending"}, status_code=202)
+
+        full_phone, national_number = normalize_phone(rsvp_request.countryCode, rsvp_request.phoneNumber)
+        return FastJSONResponse(await run_db(_save_rsvp, rsvp_request, full_phone, national_number))
 
     except HTTPException as e:
-        logger.error(f"HTTP error in RSVP creation: {str(e.detail)}")
+        logger.error("HTTP error in RSVP creation: %s", e.detail)
+        raise
+    except PoolTimeoutError:
         raise
     except Exception as e:
-        logger.error(f"Error in RSVP creation: {str(e)}")
+        logger.error("Error in RSVP creation: %s", e)
         raise HTTPException(
             status_code=500,
             detail={"message": f"Internal server error: {str(e)}"}
         )
 
+@app.get("/rsvp/status/{token}")
+@limiter.limit("60/minute")
+async def get_rsvp_status(request: Request, token: str):
+    """Progress of a submission accepted by the write-behind queue"""
+    if rsvp_queue is None:
+        raise HTTPException(status_code=404, detail="RSVP queue is not enabled")
+    status = await run_db(rsvp_queue.status, token)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown RSVP token")
+    return FastJSONResponse(status)
+
+def _fetch_changes_after(after: int):
+    with get_db_cursor() as cur:
+        return fetch_changes_after(cur, after)
+
+@app.get("/rsvp/stream", dependencies=[Depends(require_admin)])
+async def stream_rsvp_changes(
+    request: Request,
+    last_event_id: Optional[int] = Query(None, alias="lastEventId", ge=0)
+):
+    """Push guest and RSVP changes as Server-Sent Events to admin dashboards.
+
+    Reconnecting clients send Last-Event-ID (or ?lastEventId=) and get the
+    changes they missed first; an ``event: reset`` means too many were missed
+    and the guest list should be reloaded.
+    """
+    header = request.headers.get("last-event-id", "")
+    if header.isdigit():
+        last_event_id = int(header)
+    # Subscribed before the response starts, so a full process still answers 503
+    try:
+        subscription = change_feed.subscribe()
+    except TooManySubscribersError:
+        raise HTTPException(status_code=503, detail="Too many open change streams")
+
+    replay = None
+    if last_event_id is not None:
+        async def replay():
+            return await run_db(_fetch_changes_after, last_event_id)
+
+    return StreamingResponse(
+        change_feed.stream(subscription, replay),
+        media_type="text/event-stream",
+        # Frees the slot even if the client left before the stream started
+        background=BackgroundTask(change_feed.unsubscribe, subscription),
+        headers={
+            "Cache-Control": "no-cache",
+            # Events must not wait in nginx's buffer
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+# A key with a '+' is a full E.164 number and probes the unique phone_number
+# index. Bare digits may also be a national number, so they probe both
+# indexes; an exact E.164 match wins over a national one.
+FETCH_RSVP_SQL = """
+    -- name: fetch_rsvp
+    SELECT
+        r.id,
+        g.full_name,
+        g.phone_number,
+        g.country_code,
+        r.guest_relationship,
+        r.household_count,
+        r.food_allergies,
+        r.is_visiting_venue,
+        r.arrival_date,
+        r.additional_notes
+    FROM guests g
+    JOIN rsvp_responses r ON g.id = r.guest_id
+    WHERE g.phone_number = %(e164)s OR g.national_number = %(national)s
+    ORDER BY g.phone_number = %(e164)s DESC, g.id
+    LIMIT 1
+"""
+FETCH_RSVP = statements.register(FETCH_RSVP_SQL)
+
+def _fetch_rsvp(lookup_key: str):
+    """Load the RSVP joined with its guest for a phone number, through the RSVP cache"""
+    cached = rsvp_cache.get(lookup_key)
+    if cached is not None:
+        return cached
+    with get_db_cursor() as cur:
+        if lookup_key.startswith("+"):
+            params = {"e164": lookup_key, "national": None}
+        else:
+            params = {"e164": f"+{lookup_key}", "national": lookup_key}
+        statements.execute(cur, FETCH_RSVP, params)
+        result = cur.fetchone()
+    # Only found RSVPs are cached, so a guest who submits later is seen at once
+    if result:
+        result = rsvp_response_content(result)
+        rsvp_cache.set(lookup_key, result)
+    return result
+
 @app.get("/rsvp/{phone_number}", response_model=RSVPResponse)
-@limiter.limit("10/minute")
+@limiter.limit(RATE_LIMIT_LOOKUP)
 async def get_rsvp(request: Request, phone_number: str):
-    # Sanitize phone number
-    clean_phone = sanitize_phone(phone_number)
-    if not clean_phone:
+    lookup_key = phone_lookup_key(phone_number)
+    if not lookup_key:
         raise HTTPException(status_code=400, detail="Invalid phone number format")
-    
-    logger.info(f"Looking up RSVP for phone number: {clean_phone}")
-    
+
+    result = await run_db(_fetch_rsvp, lookup_key)
+    if not result:
+        raise HTTPException(status_code=404, detail="RSVP not found")
+
+    return FastJSONResponse(result)
+
+def _guest_details_filters(after=None, relationship=None, is_visiting_venue=None):
+    """Build the WHERE clause shared by the guest-details list endpoints"""
+    clauses, params = [], []
+    if after is not None:
+        clauses.append("guest_id > %s")
+        params.append(after)
+    if relationship is not None:
+        clauses.append("guest_relationship = %s")
+        params.append(relationship)
+    if is_visiting_venue is not None:
+        clauses.append("is_visiting_venue = %s")
+        params.append(is_visiting_venue)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+def _fetch_guest_details_page(limit: int, **filters):
+    where, params = _guest_details_filters(**filters)
     with get_db_cursor() as cur:
+        # Fetch one extra row to learn whether another page follows
         cur.execute(
-            """
-            SELECT 
-                r.id,
-                g.full_name,
-                g.phone_number,
-                g.country_code,
-                r.guest_relationship,
-                r.household_count,
-                r.food_allergies,
-                r.is_visiting_venue,
-                r.arrival_date,
-                r.additional_notes
-            FROM guests g
-            JOIN rsvp_responses r ON g.id = r.guest_id
-            WHERE g.phone_number = %s
-            """,
-            (clean_phone,)
-        )
-        result = cur.fetchone()
-        
-        if not result:
-            raise HTTPException(status_code=404, detail="RSVP not found")
-        
-        return RSVPResponse(
-            id=result['id'],
-            fullName=result['full_name'],
-            phoneNumber=clean_phone,
-            countryCode=result['country_code'],
-            guest_relationship=result['guest_relationship'],
-            householdCount=result['household_count'],
-            foodAllergies=result['food_allergies'],
-            isVisitingVenue=result['is_visiting_venue'],
-            arrivalDate=result['arrival_date'],
-            additionalNotes=result['additional_notes']
+            "-- name: guest_details_page\n"
+            f"SELECT * FROM guest_rsvp_details {where} ORDER BY guest_id LIMIT %s",
+            params + [limit + 1]
         )
+        return cur.fetchall()
 
-@app.get("/guest-details/")
-@limiter.limit("10/minute")
-async def get_all_guest_details(request: Request):
-    """Get all guest details from the view"""
+def _stream_guest_details(limit: Optional[int], **filters):
+    """Yield NDJSON chunks from a server-side cursor, one chunk per fetch"""
+    where, params = _guest_details_filters(**filters)
+    sql = f"SELECT * FROM guest_rsvp_details {where} ORDER BY guest_id"
+    if limit is not None:
+        sql += " LIMIT %s"
+        params.append(limit)
+    with get_db_cursor(name="guest_details_stream", itersize=GUEST_DETAILS_STREAM_CHUNK) as cur:
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(GUEST_DETAILS_STREAM_CHUNK)
+            if not rows:
+                break
+            yield dumps_lines(rows)
+
+GUEST_DETAILS_ITEM_SQL = "-- name: guest_details_item\nSELECT * FROM guest_rsvp_details WHERE guest_id = %s"
+GUEST_DETAILS_ITEM = statements.register(GUEST_DETAILS_ITEM_SQL)
+
+def _fetch_guest_details(guest_id: int):
+    with get_db_cursor() as cur:
+        statements.execute(cur, GUEST_DETAILS_ITEM, (guest_id,))
+        return cur.fetchone()
+
+def _export_rows(cur, sql, params):
+    cur.execute(sql, params)
+    while True:
+        rows = cur.fetchmany(EXPORT_CHUNK_ROWS)
+        if not rows:
+            break
+        yield [[row[column] for column in EXPORT_COLUMNS] for row in rows]
+
+def _export_guest_details(fmt: str, **filters):
+    """Yield the guest list as CSV or XLSX bytes, reading rows from a server-side cursor"""
+    where, params = _guest_details_filters(**filters)
+    sql = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM guest_rsvp_details {where} ORDER BY guest_id"
+    if fmt == "csv":
+        with get_db_cursor(name="guest_details_export", itersize=EXPORT_CHUNK_ROWS) as cur:
+            yield from csv_chunks(EXPORT_COLUMNS, _export_rows(cur, sql, params))
+        return
+    # The workbook has to be finished before it can be sent, so release the
+    # connection first and then stream the file from disk
+    with get_db_cursor(name="guest_details_export", itersize=EXPORT_CHUNK_ROWS) as cur:
+        output = write_xlsx(EXPORT_COLUMNS, _export_rows(cur, sql, params))
+    yield from file_chunks(output)
+
+@app.get("/guest-details/export", dependencies=[Depends(require_admin)])
+async def export_guest_details(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|xlsx)$"),
+    relationship: Optional[str] = Query(None, pattern='^(bride|groom|friend)$'),
+    is_visiting_venue: Optional[bool] = None
+):
+    """Download the guest list as a CSV or XLSX spreadsheet"""
+    chunks = _export_guest_details(format, relationship=relationship, is_visiting_venue=is_visiting_venue)
+    return StreamingResponse(
+        iterate_in_db_executor(chunks),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(format)}"'}
+    )
+
+def _fetch_guest_data_version():
     with get_db_cursor() as cur:
-        try:
-            cur.execute("SELECT * FROM guest_rsvp_details")
-            results = cur.fetchall()
-            # Convert results to list of dicts for JSON serialization
-            return {"guests": [dict(row) for row in results]}
-        except Exception as e:
-            logger.error(f"Error fetching guest details: {str(e)}")
-            raise HTTPException(status_code=500, detail=str(e))
+        statements.execute(cur, GUEST_DATA_VERSION)
+        return cur.fetchone()["version"]
+
+def _guest_details_variant(page_size: int, after=None, relationship=None, is_visiting_venue=None):
+    return f"list:{page_size}:{after}:{relationship}:{is_visiting_venue}"
+
+def _build_guest_details_page(version: int, variant: str, page_size: int, **filters):
+    results = _fetch_guest_details_page(page_size, **filters)
+    guests = results[:page_size]
+    next_after = guests[-1]["guest_id"] if len(results) > page_size else None
+    return build_snapshot(version, variant, {"guests": guests, "nextAfter": next_after})
+
+def _build_guest_details_item(version: int, variant: str, guest_id: int):
+    result = _fetch_guest_details(guest_id)
+    return build_snapshot(version, variant, result) if result else None
+
+async def _serve_snapshot(request: Request, variant: str, build, *args, **kwargs):
+    """Answer from the cached snapshot for ``variant`` while the data version is unchanged.
+
+    Returns 304 when the client's ETag is current and rebuilds the snapshot
+    only after a write bumped the version. ``build`` returns None for a
+    missing resource.
+    """
+    version = await run_db(_fetch_guest_data_version)
+    etag = make_etag(version, variant)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified_response(etag)
+    snapshot = guest_details_snapshots.get(variant)
+    if snapshot is None or snapshot.version != version:
+        snapshot = await run_db(build, version, variant, *args, **kwargs)
+        if snapshot is None:
+            return None
+        guest_details_snapshots.set(variant, snapshot)
+    return snapshot_response(snapshot, request.headers.get("accept-encoding", ""))
+
+@app.get("/guest-details/")
+@limiter.limit(RATE_LIMIT_LOOKUP)
+async def get_all_guest_details(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=GUEST_DETAILS_MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, ge=0, description="Return guests with an ID greater than this"),
+    relationship: Optional[str] = Query(None, pattern='^(bride|groom|friend)$'),
+    is_visiting_venue: Optional[bool] = None,
+    format: Optional[str] = Query(None, pattern="^(json|ndjson)$")
+):
+    """Get guest details from the view, paginated by guest ID or streamed as NDJSON"""
+    filters = {"after": after, "relationship": relationship, "is_visiting_venue": is_visiting_venue}
+    if format == "ndjson" or (format is None and "application/x-ndjson" in request.headers.get("accept", "")):
+        return StreamingResponse(
+            iterate_in_db_executor(_stream_guest_details(limit, **filters)),
+            media_type="application/x-ndjson"
+        )
+
+    page_size = limit or GUEST_DETAILS_PAGE_SIZE
+    variant = _guest_details_variant(page_size, **filters)
+    try:
+        return await _serve_snapshot(
+            request, variant, _build_guest_details_page, page_size, **filters
+        )
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        logger.error("Error fetching guest details: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/guest-details/{guest_id}")
-@limiter.limit("10/minute")
+@limiter.limit(RATE_LIMIT_LOOKUP)
 async def get_guest_details(request: Request, guest_id: int):
     """Get guest details by ID from the view"""
+    try:
+        response = await _serve_snapshot(
+            request, f"guest:{guest_id}", _build_guest_details_item, guest_id
+        )
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        logger.error("Error fetching guest details: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+    if response is None:
+        raise HTTPException(status_code=404, detail="Guest not found")
+    return response
+
+def _build_stats(version: int, variant: str):
     with get_db_cursor() as cur:
-        try:
-            cur.execute("SELECT * FROM guest_rsvp_details WHERE guest_id = %s", (guest_id,))
-            result = cur.fetchone()
-            if not result:
-                raise HTTPException(status_code=404, detail="Guest not found")
-            return dict(result)
-        except Exception as e:
-            logger.error(f"Error fetching guest details: {str(e)}")
-            raise HTTPException(status_code=500, detail=str(e))
-
- 
\ No newline at end of file
+        statements.execute(cur, STATS)
+        rows = cur.fetchall()
+    return build_snapshot(version, variant, summarize_stats(rows))
+
+def _rebuild_stats():
+    with get_db_cursor() as cur:
+        statements.execute(cur, STATS)
+        before = cur.fetchall()
+        cur.execute(REBUILD_STATS_SQL)
+        statements.execute(cur, STATS)
+        after = cur.fetchall()
+    return {"drift": stats_drift(before, after), "stats": summarize_stats(after)}
+
+@app.get("/stats")
+@limiter.limit("30/minute")
+async def get_stats(request: Request):
+    """Headcounts by relationship, venue visits, arrival dates and allergies"""
+    return await _serve_snapshot(request, "stats", _build_stats)
+
+@app.post("/stats/rebuild", dependencies=[Depends(require_admin)])
+async def rebuild_stats(request: Request):
+    """Recount the RSVP summary from rsvp_responses and report any drift"""
+    return await run_db(_rebuild_stats)
+
+def _search_guests(q: str, limit: int, offset: int):
+    with get_db_cursor() as cur:
+        cur.execute(GUEST_SEARCH_SQL, search_params(q, limit, offset))
+        return search_page(cur.fetchall(), limit, offset)
+
+@app.get("/guests/search", dependencies=[Depends(require_admin)])
+async def search_guests(
+    request: Request,
+    q: str = Query(..., min_length=2, max_length=100),
+    limit: int = Query(GUEST_SEARCH_PAGE_SIZE, ge=1, le=GUEST_SEARCH_MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0)
+):
+    """Find guests by part of their name, ignoring case, accents and small typos"""
+    if len(q.strip()) < 2:
+        raise HTTPException(status_code=400, detail="Search query is too short")
+    return FastJSONResponse(await run_db(_search_guests, q, limit, offset))
+
+def _import_file(data: bytes, fmt: str):
+    return import_rows(parse_rows(data, fmt))
+
+@app.post("/guests/import", dependencies=[Depends(require_admin)])
+async def import_guests(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|xlsx|ndjson)$")
+):
+    """Bulk load guests and RSVPs from a CSV, XLSX or NDJSON request body"""
+    try:
+        fmt = format or detect_format(request.headers.get("content-type"))
+    except ImportFormatError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > IMPORT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Import file is too large")
+    data = await request.body()
+    if len(data) > IMPORT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Import file is too large")
+    if not data:
+        raise HTTPException(status_code=400, detail="Import file is empty")
+
+    try:
+        return await run_db(_import_file, data, fmt)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/cache/stats", dependencies=[Depends(require_admin)])
+async def get_cache_stats(request: Request):
+    """Hit, miss and eviction counters of the response caches"""
+    return {
+        "rsvp": await run_db(rsvp_cache.stats),
+        "guest_details_snapshots": guest_details_snapshots.stats(),
+    }
+
+@app.get("/metrics", dependencies=[Depends(require_admin)])
+async def get_metrics(request: Request):
+    """Request, query and connection pool metrics in the Prometheus text format"""
+    metrics.update_pool_gauges(get_pool().stats())
+    if rsvp_queue is not None:
+        counts = await run_db(rsvp_queue.counts)
+        for state in ("pending", "done", "failed"):
+            metrics.rsvp_queue_entries.set(counts.get(state, 0), state=state)
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+# Statements every request path starts with, prepared and run once on each
+# pooled connection so the first guests do not pay for connecting, parsing
+# and planning. The upsert is only prepared, as running it would write.
+WARMUP_QUERIES = (
+    (FETCH_RSVP, {"e164": "+0", "national": "0"}),
+    (GUEST_DETAILS_ITEM, (0,)),
+    (GUEST_DATA_VERSION, None),
+    (STATS, None),
+)
+
+@warmup.step("connections")
+def _warm_connections():
+    pool = get_pool()
+    pool.fill()
+    conns = []
+    try:
+        for _ in range(pool.min_size):
+            conns.append(pool.getconn())
+        for conn in conns:
+            with conn.cursor() as cur:
+                for statement, params in WARMUP_QUERIES:
+                    statements.execute(cur, statement, params)
+                    cur.fetchall()
+                statements.prepare(cur, UPSERT_RSVP)
+            conn.rollback()
+    finally:
+        for conn in conns:
+            pool.putconn(conn)
+
+@warmup.step("caches")
+def _warm_caches():
+    # The unfiltered first page and the stats are what the dashboards load
+    version = _fetch_guest_data_version()
+    variant = _guest_details_variant(GUEST_DETAILS_PAGE_SIZE)
+    guest_details_snapshots.set(variant, _build_guest_details_page(version, variant, GUEST_DETAILS_PAGE_SIZE))
+    guest_details_snapshots.set("stats", _build_stats(version, "stats"))
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and its event loop responds"""
+    return {"status": "ok"}
+
+def _check_database():
+    with get_db_cursor() as cur:
+        cur.execute("-- name: readiness\nSELECT 1")
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: warm-up finished and the database answers"""
+    status = warmup.status()
+    if not warmup.ready:
+        return JSONResponse(status_code=503, content=status)
+    try:
+        await run_db(_check_database)
+    except Exception as e:
+        logger.warning("Readiness check failed: %s", e)
+        return JSONResponse(status_code=503, content={**status, "status": "unavailable", "error": str(e)})
+    return status
+
+warmup.record("import", time.perf_counter() - _import_started)
@@ -0,0 +1,288 @@
+import re
+import time
+import threading
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+from psycopg2.extras import RealDictCursor
+
+from logging_config import add_query_time
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# SQL statements are tagged with a leading "-- name: <query>" comment
+_QUERY_NAME = re.compile(r"^\s*--\s*name:\s*([\w.-]+)")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        with self._lock:
+            items = sorted(self._values.items())
+            yield from self._render_samples(items)
+
+    def _render_samples(self, items):
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = REQUEST_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket counts (made cumulative when rendered), sum, count
+                series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._values.get(self._key(labels))
+            return series[2] if series else 0
+
+    def _render_samples(self, items):
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def clear(self):
+        for metric in self._metrics:
+            metric.clear()
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by method, route and status",
+    ("method", "route", "status")
+))
+http_requests_in_progress = registry.register(Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served", ("method",)
+))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Time to serve HTTP requests, including streamed bodies",
+    ("method", "route", "status"), REQUEST_BUCKETS
+))
+db_query_duration = registry.register(Histogram(
+    "db_query_duration_seconds", "Time spent in SQL statements and server-side cursor fetches",
+    ("query",), QUERY_BUCKETS
+))
+db_pool_acquire_duration = registry.register(Histogram(
+    "db_pool_acquire_duration_seconds", "Time spent waiting for a pooled database connection",
+    (), QUERY_BUCKETS
+))
+db_pool_timeouts = registry.register(Counter(
+    "db_pool_timeouts_total", "Connection checkouts that gave up because the pool was exhausted"
+))
+db_pool_connections = registry.register(Gauge(
+    "db_pool_connections", "Pooled database connections by state", ("state",)
+))
+rate_limit_rejections = registry.register(Counter(
+    "rate_limit_rejections_total", "Requests rejected by the rate limiter", ("route",)
+))
+rsvp_queue_entries = registry.register(Gauge(
+    "rsvp_queue_entries", "Entries in the RSVP write-behind queue by state", ("state",)
+))
+rsvp_queue_batch_size = registry.register(Histogram(
+    "rsvp_queue_batch_size", "RSVPs written per group commit from the write-behind queue",
+    (), (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+))
+
+startup_seconds = registry.register(Gauge(
+    "api_startup_seconds", "Time this process spent importing the app and on each warm-up step",
+    ("phase",)
+))
+
+def query_label(sql) -> str:
+    """The ``-- name:`` tag of a statement, or its leading keyword"""
+    if isinstance(sql, bytes):
+        sql = sql[:200].decode("utf-8", "replace")
+    elif not isinstance(sql, str):
+        sql = str(sql)[:200]
+    match = _QUERY_NAME.match(sql)
+    if match:
+        return match.group(1)
+    keyword = sql.split(None, 1)
+    return keyword[0].lower() if keyword else "unknown"
+
+def route_label(scope: Dict) -> str:
+    """Route template of a request, so path parameters do not explode cardinality"""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path or "unmatched"
+
+
+def _observe_query(started: float, label: str):
+    elapsed = time.perf_counter() - started
+    db_query_duration.observe(elapsed, query=label)
+    add_query_time(elapsed)
+
+
+class TimedCursor(RealDictCursor):
+    """RealDictCursor that records statement time in ``db_query_duration``.
+
+    Server-side cursors also record their fetches under the cursor's name,
+    since that is when the rows are actually read.
+    """
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _observe_query(started, self.name or query_label(query))
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _observe_query(started, self.name or query_label(query))
+
+    def fetchmany(self, size=None):
+        if not self.name:
+            return super().fetchmany(size)
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(size)
+        finally:
+            _observe_query(started, self.name)
+
+    def fetchall(self):
+        if not self.name:
+            return super().fetchall()
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            _observe_query(started, self.name)
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests and timing them until the body is sent"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc(method=method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_progress.dec(method=method)
+            labels = {"method": method, "route": route_label(scope), "status": str(status)}
+            http_requests.inc(**labels)
+            http_request_duration.observe(time.perf_counter() - started, **labels)
+
+
+def update_pool_gauges(stats: Optional[Dict]):
+    if not stats:
+        return
+    db_pool_connections.set(stats["idle"], state="idle")
+    db_pool_connections.set(stats["in_use"], state="in_use")
+    db_pool_connections.set(stats["max_size"], state="max")
@@ -0,0 +1,97 @@
+import os
+import time
+import sqlite3
+import threading
+from urllib.parse import urlparse
+from limits.storage import Storage
+
+# Expired counters are swept after this many increments
+SWEEP_EVERY = 1000
+
+
+class SQLiteStorage(Storage):
+    """Fixed-window rate limit counters in a SQLite file.
+
+    Every worker process on the host opens the same file, so limits hold
+    across workers without running Redis. Use ``sqlite:////path/to/file.db``
+    as the limiter's storage URI.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, timeout: float = 5.0, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = urlparse(uri).path or ":memory:"
+        self.timeout = timeout
+        self._local = threading.local()
+        self._increments = 0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                " key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        # One connection per thread; a forked worker must not reuse the
+        # connection its parent opened, so connections are also keyed by pid
+        conn, pid = getattr(self._local, "conn", None), getattr(self._local, "pid", None)
+        if conn is None or pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                """
+                INSERT INTO rate_limits (key, count, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    count = CASE WHEN expires_at <= ? THEN excluded.count ELSE count + excluded.count END,
+                    expires_at = CASE WHEN expires_at <= ? OR ? THEN excluded.expires_at ELSE expires_at END
+                """,
+                (key, amount, now + expiry, now, now, bool(elastic_expiry))
+            )
+            count = conn.execute("SELECT count FROM rate_limits WHERE key = ?", (key,)).fetchone()[0]
+            self._increments += 1
+            if self._increments % SWEEP_EVERY == 0:
+                conn.execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return count
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT count FROM rate_limits WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = self._connection().execute(
+            "SELECT expires_at FROM rate_limits WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row and row[0] > time.time() else time.time()
+
+    def check(self):
+        try:
+            self._connection().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self._connection().execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key):
+        self._connection().execute("DELETE FROM rate_limits WHERE key = ?", (key,))
@@ -0,0 +1,312 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import psycopg2
+
+import metrics
+from cache import rsvp_cache
+from database import DB_POOL_TIMEOUT, PoolTimeoutError
+from importer import upsert_rsvps
+from models import RSVPRequest
+from utils import get_db_cursor, normalize_phone, rsvp_cache_keys
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Queue file shared by the workers on one host. When empty, POST /rsvp/
+# writes straight to PostgreSQL.
+RSVP_QUEUE_PATH = os.getenv("RSVP_QUEUE_PATH", "")
+RSVP_QUEUE_BATCH_SIZE = int(os.getenv("RSVP_QUEUE_BATCH_SIZE", "500"))
+# Time the drainer waits after a submission so a burst joins one commit
+RSVP_QUEUE_BATCH_DELAY_MS = float(os.getenv("RSVP_QUEUE_BATCH_DELAY_MS", "20"))
+# Poll interval for entries queued by other worker processes
+RSVP_QUEUE_POLL_MS = float(os.getenv("RSVP_QUEUE_POLL_MS", "250"))
+# Seconds processed entries are kept for GET /rsvp/status/{token}
+RSVP_QUEUE_RETENTION = float(os.getenv("RSVP_QUEUE_RETENTION", "86400"))
+# Statement timeout of a batch write, so a stuck write cannot outlive the lease
+RSVP_QUEUE_WRITE_TIMEOUT = float(os.getenv("RSVP_QUEUE_WRITE_TIMEOUT", "10"))
+
+# One drainer at a time holds the lease, so batches commit in queue order.
+# It is renewed before every write and outlasts the longest one: the wait for
+# a pooled connection plus the statement timeout, with a margin
+LEASE_SECONDS = DB_POOL_TIMEOUT + RSVP_QUEUE_WRITE_TIMEOUT + 10
+SWEEP_INTERVAL = 60
+MAX_BACKOFF_SECONDS = 30
+
+# PostgreSQL is unreachable, or hit the write timeout (QueryCanceled is an
+# OperationalError): the batch stays queued and is retried
+RETRYABLE_ERRORS = (PoolTimeoutError, psycopg2.OperationalError, psycopg2.InterfaceError)
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rsvp_queue (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        token TEXT UNIQUE NOT NULL,
+        payload TEXT NOT NULL,
+        state TEXT NOT NULL DEFAULT 'pending',
+        enqueued_at REAL NOT NULL,
+        processed_at REAL,
+        result TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS rsvp_queue_state_seq_idx ON rsvp_queue (state, seq);
+    CREATE TABLE IF NOT EXISTS rsvp_queue_lease (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+"""
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+class RSVPQueue:
+    """Durable write-behind queue for RSVP submissions.
+
+    Submissions are committed to a SQLite file (WAL, fsync on commit) and
+    acknowledged with a token. A background thread upserts them into
+    PostgreSQL in batches, one transaction per batch. Entries are only
+    marked done after PostgreSQL committed, so anything queued before a
+    crash is written on the next start; replaying a batch that had already
+    committed repeats the same upserts.
+    """
+
+    def __init__(self, path: str, batch_size: int = RSVP_QUEUE_BATCH_SIZE,
+                 batch_delay_ms: float = RSVP_QUEUE_BATCH_DELAY_MS,
+                 poll_ms: float = RSVP_QUEUE_POLL_MS, retention: float = RSVP_QUEUE_RETENTION):
+        self.path = path
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay_ms / 1000
+        self.poll_interval = poll_ms / 1000
+        self.retention = retention
+        self.owner = uuid.uuid4().hex
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._next_sweep = 0.0
+        self._connection().executescript(SCHEMA)
+
+    def _reset_after_fork(self):
+        """Give a forked worker its own lease owner; the parent's thread did not survive the fork"""
+        self.owner = uuid.uuid4().hex
+        self._thread = None
+
+    def _connection(self):
+        # One connection per thread, and a forked worker opens its own
+        conn, pid = getattr(self._local, "conn", None), getattr(self._local, "pid", None)
+        if conn is None or pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # An acknowledged submission must survive a power loss
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def enqueue(self, rsvp_request: RSVPRequest) -> str:
+        """Persist a validated submission and return its status token"""
+        token = uuid.uuid4().hex
+        self._connection().execute(
+            "INSERT INTO rsvp_queue (token, payload, enqueued_at) VALUES (?, ?, ?)",
+            (token, rsvp_request.model_dump_json(), time.time())
+        )
+        self._wakeup.set()
+        return token
+
+    def status(self, token: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT state, enqueued_at, processed_at, result FROM rsvp_queue WHERE token = ?",
+            (token,)
+        ).fetchone()
+        if row is None:
+            return None
+        state, enqueued_at, processed_at, result = row
+        status = {
+            "token": token,
+            "status": state,
+            "enqueuedAt": _isoformat(enqueued_at),
+            "processedAt": _isoformat(processed_at),
+        }
+        if result is not None:
+            status["rsvp" if state == "done" else "error"] = json.loads(result)
+        return status
+
+    def counts(self) -> Dict[str, int]:
+        """Number of entries in each state"""
+        rows = self._connection().execute("SELECT state, count(*) FROM rsvp_queue GROUP BY state")
+        return {state: count for state, count in rows}
+
+    def _acquire_lease(self) -> bool:
+        """Take or renew the drainer lease unless another live drainer holds it"""
+        now = time.time()
+        cur = self._connection().execute(
+            """
+            INSERT INTO rsvp_queue_lease (id, owner, expires_at) VALUES (1, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+            WHERE rsvp_queue_lease.owner = excluded.owner OR rsvp_queue_lease.expires_at <= ?
+            """,
+            (self.owner, now + LEASE_SECONDS, now)
+        )
+        return cur.rowcount == 1
+
+    def _release_lease(self):
+        self._connection().execute("DELETE FROM rsvp_queue_lease WHERE owner = ?", (self.owner,))
+
+    def _write(self, entries: List[Tuple[str, RSVPRequest]]) -> Dict[str, Tuple[str, Dict]]:
+        """Upsert a batch in one PostgreSQL transaction"""
+        # Later submissions for the same phone win, as they would one by one
+        latest = {}
+        for _, rsvp_request in entries:
+            latest[normalize_phone(rsvp_request.countryCode, rsvp_request.phoneNumber)] = rsvp_request
+        with get_db_cursor() as cur:
+            cur.execute(
+                "SELECT set_config('statement_timeout', %s, true)",
+                (str(int(RSVP_QUEUE_WRITE_TIMEOUT * 1000)),)
+            )
+            saved = upsert_rsvps(cur, list(latest.values()))
+        metrics.rsvp_queue_batch_size.observe(len(latest))
+        rsvp_cache.delete(*{key for phones in latest for key in rsvp_cache_keys(*phones)})
+
+        results = {}
+        for token, rsvp_request in entries:
+            phone_number, _ = normalize_phone(rsvp_request.countryCode, rsvp_request.phoneNumber)
+            row = saved[phone_number]
+            results[token] = ("done", {
+                **rsvp_request.model_dump(),
+                "id": row["id"],
+                "phoneNumber": phone_number,
+                "wasUpdated": not row["inserted"],
+            })
+        return results
+
+    def _write_one_by_one(self, entries: List[Tuple[str, RSVPRequest]]) -> Dict[str, Tuple[str, Dict]]:
+        """Isolate the entries that made a batch fail"""
+        results = {}
+        for token, rsvp_request in entries:
+            if not self._acquire_lease():
+                # Another drainer took over; the rest stays pending for it
+                break
+            try:
+                results.update(self._write([(token, rsvp_request)]))
+            except RETRYABLE_ERRORS:
+                self._finish(results)
+                raise
+            except Exception as e:
+                logger.error("Queued RSVP %s could not be saved: %s", token, e)
+                results[token] = ("failed", {"message": str(e)})
+        return results
+
+    def _finish(self, results: Dict[str, Tuple[str, Dict]]):
+        if not results:
+            return
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "UPDATE rsvp_queue SET state = ?, result = ?, processed_at = ?, attempts = attempts + 1"
+                " WHERE token = ?",
+                [(state, json.dumps(result), now, token) for token, (state, result) in results.items()]
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def drain_once(self) -> int:
+        """Write the oldest pending batch, returning how many entries it had.
+
+        Nothing is written unless this drainer (still) holds the lease.
+        """
+        if not self._acquire_lease():
+            return 0
+        rows = self._connection().execute(
+            "SELECT token, payload FROM rsvp_queue WHERE state = 'pending' ORDER BY seq LIMIT ?",
+            (self.batch_size,)
+        ).fetchall()
+        if not rows:
+            return 0
+        entries = [(token, RSVPRequest.model_validate_json(payload)) for token, payload in rows]
+        try:
+            results = self._write(entries)
+        except RETRYABLE_ERRORS:
+            raise
+        except Exception as e:
+            logger.error("RSVP batch of %d failed, retrying one by one: %s", len(entries), e)
+            results = self._write_one_by_one(entries)
+        self._finish(results)
+        logger.debug("Wrote %d queued RSVPs", len(entries))
+        return len(entries)
+
+    def sweep(self):
+        """Forget processed entries older than the retention period"""
+        self._connection().execute(
+            "DELETE FROM rsvp_queue WHERE state <> 'pending' AND processed_at < ?",
+            (time.time() - self.retention,)
+        )
+
+    def drain(self, wait: bool = False):
+        """Write everything pending if this process holds the drainer lease"""
+        if not self._acquire_lease():
+            return
+        if wait and self.batch_delay:
+            self._stopping.wait(self.batch_delay)
+        while self.drain_once() == self.batch_size:
+            pass
+        if time.monotonic() >= self._next_sweep:
+            self.sweep()
+            self._next_sweep = time.monotonic() + SWEEP_INTERVAL
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stopping.is_set():
+            woken = self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                self.drain(wait=woken)
+                backoff = 1.0
+            except Exception as e:
+                logger.error("Draining the RSVP queue failed, retrying in %.0fs: %s", backoff, e)
+                self._stopping.wait(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+        # Whatever cannot be written now stays queued for the next start
+        try:
+            self.drain()
+        except Exception as e:
+            logger.warning("RSVP queue not fully drained on shutdown: %s", e)
+        self._release_lease()
+
+    def start(self):
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="rsvp-queue", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        if self._thread is not None:
+            self._stopping.set()
+            self._wakeup.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+
+rsvp_queue = RSVPQueue(RSVP_QUEUE_PATH) if RSVP_QUEUE_PATH else None
+
+def _reset_after_fork():
+    # Workers forked from a preloaded app would otherwise share one owner
+    # and all hold the lease at once
+    if rsvp_queue is not None:
+        rsvp_queue._reset_after_fork()
+
+os.register_at_fork(after_in_child=_reset_after_fork)
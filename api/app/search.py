@@ -0,0 +1,41 @@
+import os
+
+GUEST_SEARCH_PAGE_SIZE = int(os.getenv("GUEST_SEARCH_PAGE_SIZE", "20"))
+GUEST_SEARCH_MAX_PAGE_SIZE = int(os.getenv("GUEST_SEARCH_MAX_PAGE_SIZE", "100"))
+# Minimum pg_trgm word similarity (0-1) for a name to match; lower values
+# tolerate more typos
+GUEST_SEARCH_THRESHOLD = float(os.getenv("GUEST_SEARCH_THRESHOLD", "0.4"))
+
+# Names are compared lower-cased and without accents, matching the
+# guests_full_name_trgm_idx expression (see Database/schema.sql) so the
+# <% operator is answered from the trigram index. Matches are ranked by how
+# well the query matches a part of the name, then the whole name.
+GUEST_SEARCH_SQL = """
+    -- name: guest_search
+    SET LOCAL pg_trgm.word_similarity_threshold = %(threshold)s;
+    SELECT d.*,
+           word_similarity(lower(f_unaccent(%(q)s)), lower(f_unaccent(d.full_name))) AS score
+    FROM guest_rsvp_details d
+    WHERE lower(f_unaccent(%(q)s)) <%% lower(f_unaccent(d.full_name))
+    ORDER BY score DESC,
+             similarity(lower(f_unaccent(%(q)s)), lower(f_unaccent(d.full_name))) DESC,
+             d.guest_id
+    LIMIT %(limit)s OFFSET %(offset)s
+"""
+
+
+def search_params(q: str, limit: int, offset: int) -> dict:
+    """Parameters of GUEST_SEARCH_SQL, asking for one extra row to detect a next page"""
+    return {
+        "q": " ".join(q.split()),
+        "threshold": GUEST_SEARCH_THRESHOLD,
+        "limit": limit + 1,
+        "offset": offset,
+    }
+
+def search_page(rows, limit: int, offset: int) -> dict:
+    """Shape search rows into the GET /guests/search response"""
+    return {
+        "guests": rows[:limit],
+        "nextOffset": offset + limit if len(rows) > limit else None,
+    }
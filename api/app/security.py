@@ -0,0 +1,20 @@
+import os
+import secrets
+import logging
+from typing import Optional
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+def require_admin(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)):
+    """Allow the request only when it carries the ADMIN_API_TOKEN bearer token"""
+    token = os.getenv("ADMIN_API_TOKEN")
+    if not token:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    if credentials is None or not secrets.compare_digest(credentials.credentials, token):
+        logger.warning("Rejected admin request with missing or invalid token")
+        raise HTTPException(status_code=401, detail="Invalid or missing admin token")
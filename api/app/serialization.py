@@ -0,0 +1,58 @@
+import json
+from typing import Any, Dict, Iterable, Mapping
+from fastapi.responses import Response
+
+from utils import json_default
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard library encoder is the fallback
+    orjson = None
+
+# RSVPResponse field -> column of the joined guest/RSVP row
+RSVP_RESPONSE_COLUMNS = (
+    ("id", "id"),
+    ("fullName", "full_name"),
+    ("phoneNumber", "phone_number"),
+    ("countryCode", "country_code"),
+    ("guest_relationship", "guest_relationship"),
+    ("householdCount", "household_count"),
+    ("foodAllergies", "food_allergies"),
+    ("isVisitingVenue", "is_visiting_venue"),
+    ("arrivalDate", "arrival_date"),
+    ("additionalNotes", "additional_notes"),
+)
+
+
+def dumps(payload: Any) -> bytes:
+    """Encode a payload as compact JSON bytes"""
+    if orjson is not None:
+        # orjson handles datetimes and dict subclasses such as RealDictRow
+        # natively; json_default covers the rest (Decimal)
+        return orjson.dumps(payload, default=json_default)
+    return json.dumps(payload, default=json_default, separators=(",", ":")).encode("utf-8")
+
+def dumps_lines(rows: Iterable[Any]) -> bytes:
+    """Encode rows as newline-delimited JSON"""
+    return b"".join(dumps(row) + b"\n" for row in rows)
+
+def rsvp_response_content(row: Mapping, **overrides) -> Dict[str, Any]:
+    """Map a joined guest/RSVP row straight to the RSVPResponse shape"""
+    content = {field: row[column] for field, column in RSVP_RESPONSE_COLUMNS}
+    content["wasUpdated"] = bool(row.get("was_updated", False))
+    content.update(overrides)
+    return content
+
+
+class FastJSONResponse(Response):
+    """JSON response for payloads built from trusted database rows.
+
+    Returning it from a handler bypasses FastAPI's response_model validation
+    and jsonable_encoder pass; the declared response_model still documents
+    the shape in the OpenAPI schema.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,105 @@
+import os
+import gzip
+import zlib
+from typing import Any, Dict, Optional
+from fastapi.responses import Response
+
+import statements
+from cache import MemoryCache
+from serialization import dumps
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+GUEST_DETAILS_SNAPSHOT_MAX = int(os.getenv("GUEST_DETAILS_SNAPSHOT_MAX", "256"))
+GUEST_DETAILS_SNAPSHOT_TTL = float(os.getenv("GUEST_DETAILS_SNAPSHOT_TTL", "3600"))
+
+# Bumped in the writing transaction by triggers on guests and rsvp_responses.
+# Read it before the data: a snapshot may then be newer than its version
+# (costing one extra rebuild) but never older.
+GUEST_DATA_VERSION_SQL = "-- name: guest_data_version\nSELECT version FROM data_versions WHERE name = 'guest_details'"
+GUEST_DATA_VERSION = statements.register(GUEST_DATA_VERSION_SQL)
+
+
+class Snapshot:
+    """A serialized response body with its precompressed variants"""
+
+    __slots__ = ("version", "etag", "bodies")
+
+    def __init__(self, version: int, etag: str, bodies: Dict[str, bytes]):
+        self.version = version
+        self.etag = etag
+        self.bodies = bodies
+
+
+# Snapshots of guest-details responses keyed by endpoint and query parameters
+guest_details_snapshots = MemoryCache(
+    max_size=GUEST_DETAILS_SNAPSHOT_MAX, ttl=GUEST_DETAILS_SNAPSHOT_TTL
+)
+
+def make_etag(version: int, variant: str) -> str:
+    return f'W/"{version}-{zlib.crc32(variant.encode("utf-8")):08x}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+def build_snapshot(version: int, variant: str, payload: Any) -> Snapshot:
+    """Serialize a payload once and compress it for every supported encoding"""
+    body = dumps(payload)
+    bodies = {"identity": body, "gzip": gzip.compress(body, compresslevel=9)}
+    if brotli is not None:
+        bodies["br"] = brotli.compress(body, quality=11)
+    return Snapshot(version, make_etag(version, variant), bodies)
+
+def choose_encoding(accept_encoding: str, available) -> str:
+    """Pick the best precompressed body the client accepts"""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    for encoding in ("br", "gzip"):
+        if encoding in accepted and encoding in available:
+            return encoding
+    return "identity"
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers=_cache_headers(etag))
+
+def snapshot_response(snapshot: Snapshot, accept_encoding: str) -> Response:
+    encoding = choose_encoding(accept_encoding, snapshot.bodies)
+    headers = _cache_headers(snapshot.etag)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(
+        content=snapshot.bodies[encoding],
+        media_type="application/json",
+        headers=headers
+    )
+
+def _cache_headers(etag: str) -> Dict[str, str]:
+    return {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
@@ -0,0 +1,69 @@
+import time
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+import metrics
+from utils import run_db
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF_SECONDS = 30
+
+
+class Warmup:
+    """Blocking warm-up steps run once per process before it reports ready.
+
+    Steps run in registration order on the database executor, each retried
+    with backoff until it succeeds, so a worker that starts before
+    PostgreSQL is reachable becomes ready once it is. Their durations and
+    the total time to ready are logged and exported as
+    ``api_startup_seconds``.
+    """
+
+    def __init__(self):
+        self.steps: List[Tuple[str, Callable[[], None]]] = []
+        self.timings: Dict[str, float] = {}
+        self.ready = False
+        self.error: Optional[str] = None
+
+    def step(self, name: str):
+        """Decorator registering a blocking warm-up step"""
+        def register(func):
+            self.steps.append((name, func))
+            return func
+        return register
+
+    def record(self, phase: str, seconds: float):
+        self.timings[phase] = round(seconds, 3)
+        metrics.startup_seconds.set(seconds, phase=phase)
+
+    async def run(self):
+        started = time.perf_counter()
+        for name, func in self.steps:
+            backoff = 1.0
+            while True:
+                step_started = time.perf_counter()
+                try:
+                    await run_db(func)
+                    break
+                except Exception as e:
+                    self.error = f"{name}: {e}"
+                    logger.warning("Warm-up step %s failed, retrying in %.0fs: %s", name, backoff, e)
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+            self.record(name, time.perf_counter() - step_started)
+        self.record("ready", time.perf_counter() - started)
+        self.ready = True
+        self.error = None
+        logger.info("Ready after %.3fs of warm-up: %s", self.timings["ready"], self.timings)
+
+    def status(self) -> Dict:
+        status = {"status": "ready" if self.ready else "starting", "startupSeconds": self.timings}
+        if self.error is not None:
+            status["error"] = self.error
+        return status
+
+
+warmup = Warmup()
@@ -0,0 +1,157 @@
+import os
+import re
+import logging
+from typing import Dict, List
+
+from psycopg2 import errors, extensions
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Turn off behind a pooler in transaction mode (e.g. PgBouncer), where the
+# next transaction may run on a server session that never saw the PREPARE
+DB_PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "true").lower() in ("1", "true", "yes")
+
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s|%%")
+_NAME_TAG = re.compile(r"\s*--\s*name:\s*(\w+)")
+
+# The session lost the statement (DISCARD ALL, a pooler switching sessions)
+# or its cached plan no longer fits the schema (a view gained columns)
+STALE_ERRORS = (
+    errors.InvalidSqlStatementName,
+    errors.DuplicatePreparedStatement,
+    errors.FeatureNotSupported,
+)
+
+
+class Statement:
+    """A registered query, prepared once per connection and executed by name.
+
+    ``%(name)s`` and ``%s`` placeholders become ``$n`` parameters of the
+    server-side statement; a name used several times binds one parameter.
+    """
+
+    __slots__ = ("name", "sql", "params", "prepare_sql", "execute_sql")
+
+    def __init__(self, name: str, sql: str):
+        self.name = name
+        self.sql = sql
+        self.params = []
+        styles = set()
+
+        def to_parameter(match):
+            if match.group(0) == "%%":
+                return "%"
+            if match.group(1) is None:
+                styles.add("positional")
+                self.params.append(len(self.params))
+                return f"${len(self.params)}"
+            styles.add("named")
+            if match.group(1) not in self.params:
+                self.params.append(match.group(1))
+            return f"${self.params.index(match.group(1)) + 1}"
+
+        body = _PLACEHOLDER.sub(to_parameter, sql)
+        if len(styles) > 1:
+            raise ValueError(f"Statement {name} mixes named and positional placeholders")
+        self.prepare_sql = f"PREPARE {name} AS {body}"
+        arguments = f" ({', '.join(['%s'] * len(self.params))})" if self.params else ""
+        # Keeps the tag, so metrics still label the query by name
+        self.execute_sql = f"-- name: {name}\nEXECUTE {name}{arguments}"
+
+    def bind(self, params) -> List:
+        """Arguments of the EXECUTE, in parameter order"""
+        return [params[key] for key in self.params]
+
+
+class StatementConnection(extensions.connection):
+    """psycopg2 connection that remembers the statements prepared on it.
+
+    The set lives and dies with the server session, so a connection the
+    pool recycles starts empty and prepares again on first use.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+_registry: Dict[str, Statement] = {}
+
+def register(sql: str) -> Statement:
+    """Register a query for preparing, named after its ``-- name:`` tag"""
+    match = _NAME_TAG.match(sql)
+    if match is None:
+        raise ValueError("Prepared statements need a '-- name:' tag")
+    name = match.group(1)
+    existing = _registry.get(name)
+    if existing is not None:
+        if existing.sql != sql:
+            raise ValueError(f"Another statement is already registered as {name}")
+        return existing
+    statement = _registry[name] = Statement(name, sql)
+    return statement
+
+def registered() -> List[Statement]:
+    return list(_registry.values())
+
+def _tracking_connection(cur):
+    """The cursor's connection if statements can be prepared on it"""
+    conn = getattr(cur, "connection", None)
+    if not DB_PREPARED_STATEMENTS or not hasattr(conn, "prepared") or cur.name:
+        return None
+    return conn
+
+def _prepare(cur, conn: StatementConnection, statement: Statement):
+    if statement.name not in conn.prepared:
+        cur.execute(statement.prepare_sql)
+        conn.prepared.add(statement.name)
+
+def _with_retry(cur, conn: StatementConnection, statement: Statement, run):
+    """Call ``run``, preparing everything afresh and retrying once if the session's copy is stale.
+
+    A statement that opens the transaction is retried after a rollback.
+    Later ones run inside a savepoint, so the retry keeps the work done before.
+    """
+    in_transaction = conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE
+    if in_transaction:
+        cur.execute("SAVEPOINT prepared_statement")
+    try:
+        run()
+    except STALE_ERRORS as e:
+        logger.warning("Prepared statement %s is stale, preparing it again: %s", statement.name, e)
+        if in_transaction:
+            cur.execute("ROLLBACK TO SAVEPOINT prepared_statement")
+        else:
+            conn.rollback()
+        conn.prepared.clear()
+        cur.execute("DEALLOCATE ALL")
+        run()
+    if in_transaction:
+        cur.execute("RELEASE SAVEPOINT prepared_statement")
+
+def prepare(cur, statement: Statement) -> bool:
+    """Prepare ``statement`` on the cursor's connection ahead of its first use"""
+    conn = _tracking_connection(cur)
+    if conn is None:
+        return False
+    _with_retry(cur, conn, statement, lambda: _prepare(cur, conn, statement))
+    return True
+
+def execute(cur, statement: Statement, params=None):
+    """Execute ``statement`` by name, preparing it on the cursor's connection first.
+
+    Falls back to running the plain SQL on connections that do not track
+    prepared statements, on server-side cursors (which cannot EXECUTE) and
+    when DB_PREPARED_STATEMENTS is off.
+    """
+    conn = _tracking_connection(cur)
+    if conn is None:
+        cur.execute(statement.sql, params)
+        return
+
+    def run():
+        _prepare(cur, conn, statement)
+        cur.execute(statement.execute_sql, statement.bind(params) if statement.params else None)
+
+    _with_retry(cur, conn, statement, run)
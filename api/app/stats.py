@@ -0,0 +1,58 @@
+import logging
+from typing import Dict, Iterable, List
+
+import statements
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# rsvp_stats is maintained by triggers on rsvp_responses (see Database/schema.sql)
+STATS_SQL = """
+    -- name: rsvp_stats
+    SELECT dimension, bucket, responses, people
+    FROM rsvp_stats
+    WHERE responses <> 0
+    ORDER BY dimension, bucket
+"""
+
+STATS = statements.register(STATS_SQL)
+
+REBUILD_STATS_SQL = "-- name: rebuild_rsvp_stats\nSELECT rebuild_rsvp_stats()"
+
+
+def _counts(row=None) -> Dict[str, int]:
+    if row is None:
+        return {"responses": 0, "people": 0}
+    return {"responses": int(row["responses"]), "people": int(row["people"])}
+
+def summarize_stats(rows: Iterable[Dict]) -> Dict:
+    """Shape rsvp_stats rows into the GET /stats response"""
+    rows = list(rows)
+    by_dimension = {}
+    for row in rows:
+        by_dimension.setdefault(row["dimension"], {})[row["bucket"]] = _counts(row)
+    return {
+        "totals": by_dimension.get("total", {}).get("all", _counts()),
+        "byRelationship": by_dimension.get("relationship", {}),
+        "visitingVenue": by_dimension.get("visiting_venue", {}).get("yes", _counts()),
+        "arrivals": by_dimension.get("arrival_date", {}),
+        "foodAllergies": by_dimension.get("food_allergies", {}).get("any", _counts()),
+    }
+
+def stats_drift(before: Iterable[Dict], after: Iterable[Dict]) -> List[Dict]:
+    """List the buckets whose counts changed when the summary was rebuilt"""
+    old = {(row["dimension"], row["bucket"]): _counts(row) for row in before}
+    new = {(row["dimension"], row["bucket"]): _counts(row) for row in after}
+    drift = []
+    for key in sorted(old.keys() | new.keys()):
+        previous, current = old.get(key, _counts()), new.get(key, _counts())
+        if previous != current:
+            drift.append({
+                "dimension": key[0],
+                "bucket": key[1],
+                "before": previous,
+                "after": current,
+            })
+    if drift:
+        logger.warning("RSVP stats drifted in %d buckets, rebuilt from rsvp_responses", len(drift))
+    return drift
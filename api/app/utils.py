@@ -1,35 +1,159 @@
+import os
 import re
+import asyncio
+import anyio
+import functools
+import contextvars
+import threading
 import logging
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Tuple
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from database import get_db
+from database import get_pool, DB_POOL_MAX_SIZE, PoolTimeoutError
+import metrics
+from logging_config import add_acquire_time
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Blocking database work runs on a bounded thread pool sized to the connection
+# pool, so awaiting handlers never queue on the pool while holding a thread.
+DB_EXECUTOR_MAX_WORKERS = int(os.getenv("DB_EXECUTOR_MAX_WORKERS", str(DB_POOL_MAX_SIZE)))
+
+_db_executor = None
+_db_executor_lock = threading.Lock()
+
+_EXHAUSTED = object()
+
 def sanitize_phone(phone: str) -> str:
     """Remove any non-digit characters from phone number"""
     return re.sub(r'\D', '', phone)
 
+def normalize_phone(country_code: str, phone: str) -> Tuple[str, str]:
+    """Canonical E.164 number and national number of a phone.
+
+    Returns ``("+<country digits><national digits>", "<national digits>")``,
+    the forms stored in ``guests.phone_number`` and ``guests.national_number``.
+    """
+    national = sanitize_phone(phone)
+    return f"+{sanitize_phone(country_code)}{national}", national
+
+def phone_lookup_key(phone: str) -> str:
+    """Key for a phone as given to GET /rsvp/{phone_number}.
+
+    A leading '+' marks a full E.164 number. Bare digits are either an E.164
+    number without the '+' or a national number.
+    """
+    digits = sanitize_phone(phone)
+    if digits and phone.lstrip().startswith("+"):
+        return f"+{digits}"
+    return digits
+
+def rsvp_cache_keys(e164: str, national: str):
+    """Cache keys under which GET /rsvp/{phone_number} may have stored a guest"""
+    return {e164, e164.lstrip("+"), national}
+
+def json_default(value):
+    """Encode the date/time and decimal values psycopg2 returns"""
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
 @contextmanager
-def get_db_cursor():
-    """Context manager for database connections"""
-    conn = None
+def get_db_cursor(name=None, itersize=None):
+    """Context manager for pooled database connections.
+
+    Passing ``name`` opens a server-side cursor that fetches ``itersize``
+    rows per round trip instead of loading the whole result set. Statement
+    and checkout times are recorded in the metrics module.
+    """
+    pool = get_pool()
+    started = perf_counter()
     try:
-        conn = get_db()
-        cur = conn.cursor()
-        logger.info("Successfully created database cursor")
+        conn = pool.getconn()
+    except PoolTimeoutError:
+        metrics.db_pool_timeouts.inc()
+        raise
+    finally:
+        elapsed = perf_counter() - started
+        metrics.db_pool_acquire_duration.observe(elapsed)
+        add_acquire_time(elapsed)
+    cur = None
+    discard = False
+    try:
+        cur = conn.cursor(name=name, cursor_factory=metrics.TimedCursor)
+        if itersize:
+            cur.itersize = itersize
         yield cur
+        # A named cursor is no longer valid once its transaction has ended,
+        # so it is closed before the commit (or the rollback)
+        cur.close()
         conn.commit()
-        logger.info("Successfully committed transaction")
     except Exception as e:
-        if conn:
+        try:
+            if cur is not None and not cur.closed:
+                cur.close()
             conn.rollback()
-            logger.error(f"Rolling back transaction due to error: {str(e)}")
+            logger.error("Rolling back transaction due to error: %s", e)
+        except Exception:
+            discard = True
         raise
     finally:
-        if conn:
-            if cur:
+        # Still open if the caller stopped early (e.g. a client disconnected
+        # from a stream); putconn rolls the transaction back
+        if cur is not None and not cur.closed:
+            try:
                 cur.close()
-                logger.info("Successfully closed cursor")
-            conn.close()
-            logger.info("Successfully closed connection")
\ No newline at end of file
+            except Exception:
+                discard = True
+        pool.putconn(conn, discard=discard)
+
+def _get_db_executor():
+    global _db_executor
+    if _db_executor is None:
+        with _db_executor_lock:
+            if _db_executor is None:
+                _db_executor = ThreadPoolExecutor(
+                    max_workers=DB_EXECUTOR_MAX_WORKERS,
+                    thread_name_prefix="db"
+                )
+    return _db_executor
+
+async def run_db(func, *args, **kwargs):
+    """Run blocking database work on the bounded executor without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await loop.run_in_executor(_get_db_executor(), call)
+
+async def iterate_in_db_executor(iterator):
+    """Drive a blocking iterator on the db executor, yielding its items asynchronously.
+
+    The iterator is closed on the executor when the consumer stops early, so
+    generators holding a pooled connection release it even if the client
+    disconnects mid-stream.
+    """
+    try:
+        while True:
+            item = await run_db(next, iterator, _EXHAUSTED)
+            if item is _EXHAUSTED:
+                break
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            with anyio.CancelScope(shield=True):
+                await run_db(close)
+
+def shutdown_db_executor():
+    """Wait for in-flight database work and stop the executor threads"""
+    global _db_executor
+    with _db_executor_lock:
+        if _db_executor is not None:
+            _db_executor.shutdown(wait=True)
+            _db_executor = None
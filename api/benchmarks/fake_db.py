@@ -0,0 +1,128 @@
+"""In-memory stand-in for PostgreSQL used by the benchmarks.
+
+Statements are dispatched on their ``-- name:`` tag and each one sleeps for
+a configurable latency, so the API is measured with realistic round trips
+but without a database server.
+"""
+import time
+import random
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import metrics
+
+
+class FakeDatabase:
+    def __init__(self, latency_ms: float = 1.0, jitter_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.lock = threading.Lock()
+        self.guests = {}
+        self.national_numbers = {}
+        self.version = 1
+
+    def sleep(self):
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def seed(self, count: int, phone=lambda i: f"+1555{i:07d}"):
+        for i in range(count):
+            self.upsert({
+                "full_name": f"Guest {i}",
+                "phone_number": phone(i),
+                "national_number": phone(i)[2:],
+                "country_code": "+1",
+                "guest_relationship": "friend",
+                "household_count": 2,
+                "food_allergies": None,
+                "is_visiting_venue": i % 2 == 0,
+                "arrival_date": "2024-08-01",
+                "additional_notes": None,
+            })
+
+    def upsert(self, params):
+        now = datetime.now(timezone.utc)
+        with self.lock:
+            existing = self.guests.get(params["phone_number"])
+            row = dict(params)
+            row["id"] = existing["id"] if existing else len(self.guests) + 1
+            row["created_at"] = existing["created_at"] if existing else now
+            row["updated_at"] = now
+            self.guests[params["phone_number"]] = row
+            self.national_numbers.setdefault(params["national_number"], params["phone_number"])
+            self.version += 1
+        return {**row, "was_updated": existing is not None}
+
+    def lookup(self, e164, national):
+        with self.lock:
+            row = self.guests.get(e164)
+            if row is None and national is not None:
+                row = self.guests.get(self.national_numbers.get(national))
+        return row
+
+    def details(self):
+        with self.lock:
+            rows = list(self.guests.values())
+        return [
+            {
+                "guest_id": row["id"],
+                "full_name": row["full_name"],
+                "phone_number": row["phone_number"],
+                "country_code": row["country_code"],
+                "guest_relationship": row["guest_relationship"],
+                "household_count": row["household_count"],
+                "food_allergies": row["food_allergies"],
+                "is_visiting_venue": row["is_visiting_venue"],
+                "arrival_date": row["arrival_date"],
+                "additional_notes": row["additional_notes"],
+                "guest_created_at": row["created_at"],
+                "guest_updated_at": row["updated_at"],
+                "rsvp_created_at": row["created_at"],
+                "rsvp_updated_at": row["updated_at"],
+            }
+            for row in sorted(rows, key=lambda row: row["id"])
+        ]
+
+    @contextmanager
+    def cursor(self, name=None, itersize=None):
+        yield FakeCursor(self)
+
+
+class FakeCursor:
+    def __init__(self, db: FakeDatabase):
+        self.db = db
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        self.db.sleep()
+        query = metrics.query_label(sql)
+        if query == "upsert_rsvp":
+            self.rows = [self.db.upsert(params)]
+        elif query == "fetch_rsvp":
+            row = self.db.lookup(params["e164"], params["national"])
+            self.rows = [row] if row else []
+        elif query == "guest_data_version":
+            self.rows = [{"version": self.db.version}]
+        elif query == "guest_details_page":
+            after = params[0] if len(params) > 1 else 0
+            rows = [row for row in self.db.details() if row["guest_id"] > after]
+            self.rows = rows[:params[-1]]
+        elif query == "guest_details_item":
+            self.rows = [row for row in self.db.details() if row["guest_id"] == params[0]]
+        else:
+            self.rows = []
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        pass
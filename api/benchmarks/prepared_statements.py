@@ -0,0 +1,112 @@
+"""Micro-benchmark of the hot RSVP queries with and without prepared statements.
+
+Runs each registered hot statement on one connection, first with a plain
+``cur.execute`` (parsed and planned on every call) and then executed by
+name after a single PREPARE, and prints per-query latency percentiles:
+
+    python api/benchmarks/prepared_statements.py --database-url postgresql://...
+
+Use a database created from Database/schema.sql with some guests in it
+(e.g. after a ``run.py --backend postgres`` run). The upsert runs in a
+transaction that is rolled back, so nothing is written.
+"""
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1] / "app"
+sys.path.append(str(APP_DIR))
+
+os.environ.setdefault("DATABASE_URL", "postgresql://benchmark@localhost/benchmark")
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+import main
+import statements
+from run import percentile
+
+
+def sample_params(cur):
+    """Parameters for each hot statement, taken from an existing guest if any"""
+    cur.execute("SELECT id, phone_number, national_number FROM guests ORDER BY id LIMIT 1")
+    guest = cur.fetchone() or {"id": 0, "phone_number": "+15550000000", "national_number": "5550000000"}
+    cur.connection.rollback()
+    return [
+        (main.FETCH_RSVP, {"e164": guest["phone_number"], "national": guest["national_number"]}),
+        (main.GUEST_DETAILS_ITEM, (guest["id"],)),
+        (main.GUEST_DATA_VERSION, None),
+        (main.STATS, None),
+        (main.UPSERT_RSVP, {
+            "full_name": "Benchmark Guest", "phone_number": "+19990000000",
+            "national_number": "9990000000", "country_code": "+1",
+            "guest_relationship": "friend", "household_count": 2, "food_allergies": None,
+            "is_visiting_venue": True, "arrival_date": None, "additional_notes": None,
+        }),
+    ]
+
+def time_calls(conn, run, iterations):
+    """Latencies in microseconds of ``iterations`` calls, each in its own transaction"""
+    latencies = []
+    with conn.cursor() as cur:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            run(cur)
+            cur.fetchall()
+            latencies.append((time.perf_counter() - started) * 1e6)
+            conn.rollback()
+    return sorted(latencies)
+
+def summary(latencies):
+    return {
+        "mean": sum(latencies) / len(latencies),
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+    }
+
+def main_benchmark(database_url, iterations):
+    conn = psycopg2.connect(
+        database_url,
+        connection_factory=statements.StatementConnection,
+        cursor_factory=RealDictCursor
+    )
+    try:
+        with conn.cursor() as cur:
+            cases = sample_params(cur)
+        print(f"{'query':<20} {'mode':<9} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9}  (us)")
+        for statement, params in cases:
+            def plain(cur):
+                cur.execute(statement.sql, params)
+
+            def prepared(cur):
+                statements.execute(cur, statement, params)
+
+            # One untimed round of each, so connecting and the PREPARE are not counted
+            time_calls(conn, plain, 1)
+            time_calls(conn, prepared, 1)
+            results = {
+                "plain": summary(time_calls(conn, plain, iterations)),
+                "prepared": summary(time_calls(conn, prepared, iterations)),
+            }
+            for mode, result in results.items():
+                print(
+                    f"{statement.name:<20} {mode:<9} {result['mean']:>9.1f} {result['p50']:>9.1f} "
+                    f"{result['p95']:>9.1f} {result['p99']:>9.1f}"
+                )
+            saved = 1 - results["prepared"]["p50"] / results["plain"]["p50"]
+            print(f"{'':<20} p50 {saved:.0%} lower when prepared\n")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare plain and prepared execution of the hot queries")
+    parser.add_argument("--database-url", default=os.getenv("BENCHMARK_DATABASE_URL"),
+                        help="Database created from Database/schema.sql (default: $BENCHMARK_DATABASE_URL)")
+    parser.add_argument("--iterations", type=int, default=2000, help="Calls per query and mode (default: 2000)")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url or BENCHMARK_DATABASE_URL is required")
+    main_benchmark(args.database_url, args.iterations)
@@ -0,0 +1,232 @@
+"""Load benchmark for the RSVP API.
+
+Drives the ASGI app in-process with concurrent clients and reports
+throughput and latency percentiles per scenario:
+
+    python api/benchmarks/run.py --concurrency 20 --requests 2000
+    python api/benchmarks/run.py --backend postgres --database-url postgresql://...
+
+The fake backend injects ``--latency-ms`` per statement; the postgres backend
+needs a throwaway database created from Database/schema.sql. Results are
+written as JSON and can be compared against an earlier run with
+``--baseline``.
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import logging
+import argparse
+import platform
+import subprocess
+from pathlib import Path
+from datetime import datetime, timezone
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCHMARKS_DIR.parent / "app"
+RESULTS_DIR = BENCHMARKS_DIR / "results"
+sys.path.append(str(APP_DIR))
+
+SCENARIOS = ("rsvp_create", "rsvp_lookup", "guest_details")
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+def guest_phone(i):
+    return f"555{i:07d}"
+
+def rsvp_payload(i):
+    return {
+        "fullName": f"Benchmark Guest {i}",
+        "phoneNumber": guest_phone(i),
+        "countryCode": "+1",
+        "guest_relationship": random.choice(("bride", "groom", "friend")),
+        "householdCount": random.randint(1, 5),
+        "foodAllergies": None,
+        "isVisitingVenue": random.random() < 0.5,
+        "arrivalDate": "2024-08-01",
+        "additionalNotes": None,
+    }
+
+def make_request(scenario, guests):
+    """Pick the method, URL and body of one request for a scenario"""
+    i = random.randrange(guests)
+    if scenario == "rsvp_create":
+        return "POST", "/rsvp/", rsvp_payload(i)
+    if scenario == "rsvp_lookup":
+        return "GET", f"/rsvp/1{guest_phone(i)}", None
+    after = random.randrange(0, guests, 100)
+    return "GET", f"/guest-details/?limit=100&after={after}", None
+
+async def run_scenario(client, scenario, requests, concurrency, guests):
+    latencies = []
+    statuses = {}
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            method, url, body = make_request(scenario, guests)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, json=body)
+                status = response.status_code
+            except Exception:
+                status = "exception"
+            latencies.append(time.perf_counter() - started)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status == "exception" or status >= 500:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    to_ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "mean": to_ms(sum(latencies) / len(latencies)) if latencies else None,
+            "p50": to_ms(percentile(latencies, 0.50)),
+            "p95": to_ms(percentile(latencies, 0.95)),
+            "p99": to_ms(percentile(latencies, 0.99)),
+            "max": to_ms(latencies[-1] if latencies else None),
+        },
+    }
+
+def setup_backend(args):
+    """Point the app at the chosen backend and return it"""
+    if args.backend == "postgres":
+        if not args.database_url:
+            raise SystemExit("--database-url (or BENCHMARK_DATABASE_URL) is required for the postgres backend")
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        os.environ.setdefault("DATABASE_URL", "postgresql://benchmark@localhost/benchmark")
+
+    import main
+
+    # Measure the handlers, not the rate limiter
+    main.limiter.enabled = False
+
+    if args.backend == "fake":
+        from fake_db import FakeDatabase
+        db = FakeDatabase(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+        db.seed(args.guests, phone=lambda i: f"+1{guest_phone(i)}")
+        main.get_db_cursor = db.cursor
+    elif args.reset:
+        from utils import get_db_cursor
+        with get_db_cursor() as cur:
+            cur.execute("TRUNCATE rsvp_responses, guests RESTART IDENTITY CASCADE")
+    return main
+
+async def run(args):
+    import httpx
+
+    main = setup_backend(args)
+    # Neither the client's nor the API's per-request logging is part of what is measured
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("api.requests").setLevel(logging.WARNING)
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for scenario in args.scenarios:
+            main.rsvp_cache.clear()
+            main.guest_details_snapshots.clear()
+            results[scenario] = await run_scenario(
+                client, scenario, args.requests, args.concurrency, args.guests
+            )
+            print_scenario(scenario, results[scenario])
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def print_scenario(scenario, result):
+    latency = result["latency_ms"]
+    print(
+        f"{scenario:<14} {result['requests']:>6} req  {result['throughput_rps']:>8} req/s  "
+        f"p50 {latency['p50']:>8} ms  p95 {latency['p95']:>8} ms  p99 {latency['p99']:>8} ms  "
+        f"errors {result['errors']}"
+    )
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["scenarios"]
+    print(f"\nCompared with {baseline_path}:")
+    for scenario, result in results.items():
+        previous = baseline.get(scenario)
+        if not previous:
+            continue
+        changes = []
+        for key in ("p50", "p95", "p99"):
+            before, after = previous["latency_ms"][key], result["latency_ms"][key]
+            if before:
+                changes.append(f"{key} {100 * (after - before) / before:+.1f}%")
+        before, after = previous["throughput_rps"], result["throughput_rps"]
+        if before:
+            changes.append(f"throughput {100 * (after - before) / before:+.1f}%")
+        print(f"  {scenario:<14} {', '.join(changes)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the RSVP API in-process")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent clients (default: 10)")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per scenario (default: 1000)")
+    parser.add_argument("--guests", type=int, default=1000, help="Distinct guests to create and look up (default: 1000)")
+    parser.add_argument("--backend", choices=("fake", "postgres"), default="fake")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Fake backend latency per statement (default: 1)")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Extra random fake latency per statement")
+    parser.add_argument("--database-url", default=os.getenv("BENCHMARK_DATABASE_URL"),
+                        help="Throwaway database for the postgres backend")
+    parser.add_argument("--reset", action="store_true",
+                        help="Truncate guests and RSVPs in the postgres database before running")
+    parser.add_argument("--output", help="Results file (default: api/benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare with")
+    parser.add_argument("--seed", type=int, default=1234, help="Random seed for request mixes")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    results = asyncio.run(run(args))
+
+    timestamp = datetime.now(timezone.utc)
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{timestamp.strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "timestamp": timestamp.isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "config": {
+                key: getattr(args, key)
+                for key in ("backend", "concurrency", "requests", "guests", "latency_ms", "jitter_ms", "seed")
+            },
+            "scenarios": results,
+        }, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+if __name__ == "__main__":
+    main()
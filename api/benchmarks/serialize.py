@@ -0,0 +1,129 @@
+"""Micro-benchmark of response serialization.
+
+Compares the CPU time per request of the previous path (build RSVPResponse,
+re-validate it through response_model, jsonable_encoder, json.dumps) with the
+fast path (map the row straight to the response shape, encode with orjson),
+and of encoding a guest list page with json.dumps versus orjson:
+
+    python api/benchmarks/serialize.py --rows 1000
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+from datetime import datetime, timezone
+
+APP_DIR = Path(__file__).resolve().parents[1] / "app"
+sys.path.append(str(APP_DIR))
+
+os.environ.setdefault("DATABASE_URL", "postgresql://benchmark@localhost/benchmark")
+
+from fastapi.routing import serialize_response
+from psycopg2.extras import RealDictRow
+
+import main
+from models import RSVPResponse
+from serialization import FastJSONResponse, dumps, dumps_lines, orjson, rsvp_response_content
+from utils import json_default
+
+NOW = datetime(2024, 8, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def make_row(**columns):
+    row = RealDictRow()
+    row.update(columns)
+    return row
+
+def rsvp_row():
+    return make_row(
+        id=1, full_name="Benchmark Guest", phone_number="+15550000001", country_code="+1",
+        guest_relationship="friend", household_count=3, food_allergies=None,
+        is_visiting_venue=True, arrival_date="2024-08-01", additional_notes="See you there",
+        was_updated=False,
+    )
+
+def guest_rows(count):
+    return [
+        make_row(
+            guest_id=i, full_name=f"Benchmark Guest {i}", phone_number=f"+1555{i:07d}",
+            country_code="+1", guest_relationship="friend", household_count=2,
+            food_allergies=None, is_visiting_venue=i % 2 == 0, arrival_date="2024-08-01",
+            additional_notes=None, guest_created_at=NOW, guest_updated_at=NOW,
+            rsvp_created_at=NOW, rsvp_updated_at=NOW,
+        )
+        for i in range(count)
+    ]
+
+def response_field(path):
+    route = next(route for route in main.app.routes if getattr(route, "path", None) == path)
+    return route.secure_cloned_response_field
+
+def cpu_per_call(func, iterations):
+    func()  # warm up
+    started = time.process_time()
+    for _ in range(iterations):
+        func()
+    return (time.process_time() - started) / iterations
+
+def report(name, before, after):
+    print(
+        f"{name:<28} before {before * 1e6:>10.1f} us  after {after * 1e6:>10.1f} us  "
+        f"saved {(before - after) * 1e6:>10.1f} us ({before / after:.1f}x)"
+    )
+
+def main_benchmark(rows, iterations):
+    print(f"JSON encoder: {'orjson ' + orjson.__version__ if orjson else 'json (orjson not installed)'}\n")
+
+    row = rsvp_row()
+    field = response_field("/rsvp/{phone_number}")
+    loop = asyncio.new_event_loop()
+
+    def rsvp_before():
+        model = RSVPResponse(
+            id=row["id"], fullName=row["full_name"], phoneNumber=row["phone_number"],
+            countryCode=row["country_code"], guest_relationship=row["guest_relationship"],
+            householdCount=row["household_count"], foodAllergies=row["food_allergies"],
+            isVisitingVenue=row["is_visiting_venue"], arrivalDate=row["arrival_date"],
+            additionalNotes=row["additional_notes"], wasUpdated=row["was_updated"],
+        )
+        content = loop.run_until_complete(
+            serialize_response(field=field, response_content=model, is_coroutine=True)
+        )
+        return main.JSONResponse(content).body
+
+    def rsvp_after():
+        return FastJSONResponse(rsvp_response_content(row)).body
+
+    report("RSVP response", cpu_per_call(rsvp_before, iterations * 10), cpu_per_call(rsvp_after, iterations * 10))
+
+    page = guest_rows(rows)
+
+    def page_before():
+        return json.dumps(
+            {"guests": page, "nextAfter": None}, default=json_default, separators=(",", ":")
+        ).encode("utf-8")
+
+    def page_after():
+        return dumps({"guests": page, "nextAfter": None})
+
+    report(f"Guest list ({rows} rows)", cpu_per_call(page_before, iterations), cpu_per_call(page_after, iterations))
+
+    def ndjson_before():
+        return "".join(json.dumps(row, default=json_default) + "\n" for row in page).encode("utf-8")
+
+    def ndjson_after():
+        return dumps_lines(page)
+
+    report(f"NDJSON ({rows} rows)", cpu_per_call(ndjson_before, iterations), cpu_per_call(ndjson_after, iterations))
+
+    loop.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare response serialization paths")
+    parser.add_argument("--rows", type=int, default=1000, help="Guests in the list benchmarks (default: 1000)")
+    parser.add_argument("--iterations", type=int, default=200, help="Iterations per measurement (default: 200)")
+    args = parser.parse_args()
+    main_benchmark(args.rows, args.iterations)
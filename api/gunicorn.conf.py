@@ -0,0 +1,43 @@
+# Production server configuration, loaded by `gunicorn main:app` from the
+# working directory. Local development keeps using `uvicorn --reload` (see
+# docker-compose.yml).
+import os
+import multiprocessing
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# One worker per CPU by default
+workers = int(os.getenv("WEB_CONCURRENCY") or multiprocessing.cpu_count())
+
+# Import the app once in the master so workers fork with it loaded. The
+# connection pool and executor are created lazily, so no connections or
+# threads are shared across the fork.
+preload_app = True
+
+# Let in-flight requests finish on restart (SIGHUP) and shutdown (SIGTERM)
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+# Recycle workers now and then, staggered so they do not restart together
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+
+# Client addresses (used as rate limit keys) are taken from X-Forwarded-For
+# only when the request comes from one of these proxies
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+# Each request is summarized by the API's own request log
+accesslog = None
+errorlog = "-"
+
+# Split the database connection budget between the workers unless the pool
+# size is set explicitly
+if "DB_POOL_MAX_SIZE" not in os.environ:
+    db_max_connections = int(os.getenv("DB_MAX_CONNECTIONS", "40"))
+    os.environ["DB_POOL_MAX_SIZE"] = str(max(2, db_max_connections // workers))
+
+# Rate limits must be counted across all workers, not per process
+if workers > 1 and os.getenv("RATE_LIMIT_STORAGE_URI", "memory://").startswith("memory://"):
+    os.environ["RATE_LIMIT_STORAGE_URI"] = "sqlite:////tmp/wedding_api_rate_limits.db"
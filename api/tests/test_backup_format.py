@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[2] / "scripts"
+sys.path.append(str(SCRIPTS_DIR))
+
+import backup_format  # type: ignore
+
+HEADER = ",".join(backup_format.TABLES["guests"]) + "\n"
+
+def write_set(path, compression, guests):
+    """A backup set holding ``guests`` as COPY would have written it"""
+    path.mkdir()
+    manifest = backup_format._new_manifest(compression)
+    for table, records in (("guests", guests), ("rsvp_responses", [])):
+        filename = f"{table}.csv{backup_format.COMPRESSION_EXTENSIONS[compression]}"
+        with backup_format._compressed_writer(path / filename, compression) as (writer, hashing):
+            writer.write((",".join(backup_format.TABLES[table]) + "\n" + "".join(records)).encode("utf-8"))
+        manifest["tables"][table] = backup_format._table_entry(table, filename, len(records), hashing)
+    backup_format._write_manifest(str(path), manifest)
+    return str(path)
+
+def test_merge_keeps_a_literal_backslash_n_apart_from_null(tmp_path):
+    # The literal string \N is quoted by COPY; NULL is a bare \N
+    literal = '1,"\\N",+15550001,\\N,2026-01-01 00:00:00+00,2026-01-02 00:00:00+00\n'
+    multiline = '2,"Ann\nLee",+15550002,+1,2026-01-01 00:00:00+00,2026-01-01 00:00:00+00\n'
+    older = '1,Old Name,+15550001,+1,2026-01-01 00:00:00+00,2026-01-01 00:00:00+00\n'
+    full = write_set(tmp_path / "full", "gzip", [older, multiline])
+    incremental = write_set(tmp_path / "incremental", "gzip", [literal])
+
+    merged = tmp_path / "merged"
+    manifest = backup_format.merge_backup_sets([full, incremental], str(merged))
+    assert manifest["tables"]["guests"]["rows"] == 2
+    backup_format.verify_backup_set(str(merged))
+    with backup_format.open_table(str(merged), "guests") as f:
+        assert f.read() == HEADER + literal + multiline
@@ -1,5 +1,6 @@
 import os
 import sys
+import threading
 from pathlib import Path
 from contextlib import contextmanager
 
@@ -17,22 +18,16 @@ import main  # type: ignore
 client = TestClient(main.app)
 
 class DummyCursor:
-    def __init__(self):
+    def __init__(self, was_updated=False):
         self.call = 0
+        self.was_updated = was_updated
     def execute(self, *args, **kwargs):
         pass
     def fetchone(self):
         self.call += 1
         if self.call == 1:
-            return None
-        elif self.call == 2:
-            return {"id": 1, "full_name": "John Doe", "phone_number": "+11234567890", "country_code": "+1"}
-        elif self.call == 3:
-            return None
-        elif self.call == 4:
-            return {"id": 10}
-        elif self.call == 5:
             return {
+                "id": 10,
                 "full_name": "John Doe",
                 "phone_number": "+11234567890",
                 "country_code": "+1",
@@ -41,7 +36,8 @@ class DummyCursor:
                 "food_allergies": None,
                 "is_visiting_venue": True,
                 "arrival_date": "2024-08-01",
-                "additional_notes": "Looking forward to it!"
+                "additional_notes": "Looking forward to it!",
+                "was_updated": self.was_updated
             }
         return None
     def close(self):
@@ -74,6 +70,29 @@ def test_create_rsvp_success(monkeypatch):
     assert data["phoneNumber"] == "+11234567890"
     assert data["wasUpdated"] is False
 
+def test_create_rsvp_resubmission_is_single_statement_update(monkeypatch):
+    cursor = DummyCursor(was_updated=True)
+    executed = []
+    cursor.execute = lambda *args, **kwargs: executed.append(args)
+
+    @contextmanager
+    def updating_get_db_cursor():
+        yield cursor
+
+    monkeypatch.setattr(main, "get_db_cursor", updating_get_db_cursor)
+    payload = {
+        "fullName": "John Doe",
+        "phoneNumber": "1234567890",
+        "countryCode": "+1",
+        "guest_relationship": "friend",
+        "householdCount": 3
+    }
+    response = client.post("/rsvp/", json=payload)
+    assert response.status_code == 200
+    assert response.json()["wasUpdated"] is True
+    assert len(executed) == 1
+    assert executed[0][1]["phone_number"] == "+11234567890"
+
 def test_create_rsvp_invalid_phone():
     payload = {
         "fullName": "Jane Doe",
@@ -84,3 +103,103 @@ def test_create_rsvp_invalid_phone():
     }
     response = client.post("/rsvp/", json=payload)
     assert response.status_code == 422
+
+def test_get_rsvp_queries_off_the_event_loop(monkeypatch):
+    threads = []
+
+    class LookupCursor:
+        def execute(self, *args, **kwargs):
+            threads.append(threading.current_thread().name)
+        def fetchone(self):
+            return {
+                "id": 10,
+                "full_name": "John Doe",
+                "phone_number": "+11234567890",
+                "country_code": "+1",
+                "guest_relationship": "friend",
+                "household_count": 2,
+                "food_allergies": None,
+                "is_visiting_venue": True,
+                "arrival_date": "2024-08-01",
+                "additional_notes": None
+            }
+
+    @contextmanager
+    def lookup_get_db_cursor():
+        yield LookupCursor()
+
+    monkeypatch.setattr(main, "get_db_cursor", lookup_get_db_cursor)
+    main.rsvp_cache.clear()
+    response = client.get("/rsvp/11234567890")
+    assert response.status_code == 200
+    assert response.json()["id"] == 10
+    assert threads and threads[0].startswith("db")
+
+    # A repeat lookup is served from the cache without querying
+    response = client.get("/rsvp/1 (123) 456-7890")
+    assert response.status_code == 200
+    assert len(threads) == 1
+
+def test_create_rsvp_invalidates_cached_lookup(monkeypatch):
+    monkeypatch.setattr(main, "get_db_cursor", dummy_get_db_cursor)
+    main.rsvp_cache.set("11234567890", {"id": 1})
+    payload = {
+        "fullName": "John Doe",
+        "phoneNumber": "1234567890",
+        "countryCode": "+1",
+        "guest_relationship": "friend",
+        "householdCount": 2
+    }
+    response = client.post("/rsvp/", json=payload)
+    assert response.status_code == 200
+    assert main.rsvp_cache.get("11234567890") is None
+
+def test_get_rsvp_normalizes_lookup(monkeypatch):
+    executed = []
+
+    class LookupCursor(DummyCursor):
+        def execute(self, sql, params=None):
+            executed.append(params)
+
+    @contextmanager
+    def lookup_get_db_cursor():
+        yield LookupCursor()
+
+    monkeypatch.setattr(main, "get_db_cursor", lookup_get_db_cursor)
+    main.rsvp_cache.clear()
+
+    # With a '+' only the E.164 number is probed
+    response = client.get("/rsvp/+1 (123) 456-7890")
+    assert response.status_code == 200
+    assert response.json()["phoneNumber"] == "+11234567890"
+    assert executed[-1] == {"e164": "+11234567890", "national": None}
+
+    # Bare digits may be the E.164 digits or the national number
+    assert client.get("/rsvp/1234567890").status_code == 200
+    assert executed[-1] == {"e164": "+1234567890", "national": "1234567890"}
+
+def test_create_rsvp_stores_national_number(monkeypatch):
+    executed = []
+    cursor = DummyCursor()
+    cursor.execute = lambda sql, params=None: executed.append(params)
+
+    @contextmanager
+    def recording_get_db_cursor():
+        yield cursor
+
+    monkeypatch.setattr(main, "get_db_cursor", recording_get_db_cursor)
+    for key in ("+11234567890", "11234567890", "1234567890"):
+        main.rsvp_cache.set(key, {"id": 1})
+    payload = {
+        "fullName": "John Doe",
+        "phoneNumber": "1234567890",
+        "countryCode": "+1",
+        "guest_relationship": "friend",
+        "householdCount": 2
+    }
+    assert client.post("/rsvp/", json=payload).status_code == 200
+    assert executed[0]["phone_number"] == "+11234567890"
+    assert executed[0]["national_number"] == "1234567890"
+    assert all(
+        main.rsvp_cache.get(key) is None for key in ("+11234567890", "11234567890", "1234567890")
+    )
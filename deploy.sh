@@ -76,8 +76,7 @@ deploy_application() {
     echo "Starting production containers..."
     docker-compose -f docker-compose.prod.yml up -d
 
-    echo "Waiting for services to start..."
-    sleep 10
+    wait_for_api
 
     # Check if containers are running
     if ! docker ps | grep -q wedding; then
@@ -87,6 +86,25 @@ deploy_application() {
     fi
 }
 
+# Function to wait until the API reports ready (see /readyz)
+wait_for_api() {
+    echo "Waiting for the API to warm up..."
+    api_container=$(docker-compose -f docker-compose.prod.yml ps -q api)
+    for attempt in $(seq 1 60); do
+        status=$(docker inspect --format '{{.State.Health.Status}}' "$api_container" 2>/dev/null || true)
+        if [ "$status" = "healthy" ]; then
+            echo "API is ready:"
+            docker-compose -f docker-compose.prod.yml exec -T api python -c \
+                "import urllib.request; print(urllib.request.urlopen('http://localhost:8000/readyz').read().decode())"
+            return 0
+        fi
+        sleep 2
+    done
+    echo "Error: API did not become ready!"
+    docker-compose -f docker-compose.prod.yml logs api
+    exit 1
+}
+
 # Main deployment process
 main() {
     echo "Starting deployment process..."
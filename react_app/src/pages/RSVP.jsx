@@ -1,4 +1,4 @@
-import React, { useState, useCallback } from 'react';
+import React, { useState, useCallback, useRef } from 'react';
 import { useLanguage } from '../context/LanguageContext';
 import { RoseCorner, FloralCornerDecoration } from '../components/DecorativeElements';
 
@@ -25,6 +25,12 @@ function RSVP() {
   const [submitCount, setSubmitCount] = useState(0);
   const [lastSubmitTime, setLastSubmitTime] = useState(0);
   const [isUpdate, setIsUpdate] = useState(false);
+  // Reused when the same answers are resubmitted, so retries are not saved twice
+  const idempotencyKey = useRef(null);
+
+  const newIdempotencyKey = () => (
+    window.crypto?.randomUUID?.() || `${Date.now()}-${Math.random().toString(36).slice(2)}`
+  );
 
   // Input validation functions
   const validateFullName = (name) => {
@@ -62,6 +68,7 @@ function RSVP() {
       ...prevData,
       [name]: sanitizedValue
     }));
+    idempotencyKey.current = null;
     
     // Only clear error if the field being changed is the one that caused the error
     if (name === 'fullName' && error === t('invalidName') ||
@@ -117,10 +124,15 @@ function RSVP() {
         additionalNotes: formData.additionalNotes || null
       };
 
+      if (!idempotencyKey.current) {
+        idempotencyKey.current = newIdempotencyKey();
+      }
+
       const response = await fetch('/api/rsvp/', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Idempotency-Key': idempotencyKey.current,
         },
         body: JSON.stringify(requestData)
       });
@@ -142,6 +154,7 @@ function RSVP() {
       setSubmitCount(prev => prev + 1);
       setLastSubmitTime(now);
       setSubmitted(true);
+      idempotencyKey.current = null;
       
       // Clear sensitive data after submission
       setFormData({
@@ -0,0 +1,29 @@
+import os
+import json
+import urllib.request
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+API_URL = os.getenv('API_URL', 'http://localhost:8000')
+ADMIN_API_TOKEN = os.getenv('ADMIN_API_TOKEN')
+
+def add_api_arguments(parser):
+    """Add the --api-url and --token options shared by the admin scripts"""
+    parser.add_argument('--api-url', default=API_URL, help=f"API base URL (default: {API_URL})")
+    parser.add_argument('--token', default=ADMIN_API_TOKEN, help='Admin API token (default: $ADMIN_API_TOKEN)')
+
+def admin_request(api_url, token, path, data=None, content_type=None, method='POST'):
+    """Call an admin endpoint and return its decoded JSON response"""
+    headers = {'Authorization': f"Bearer {token}"}
+    if content_type:
+        headers['Content-Type'] = content_type
+    request = urllib.request.Request(
+        f"{api_url.rstrip('/')}{path}",
+        data=data,
+        method=method,
+        headers=headers
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import argparse
+from dotenv import load_dotenv
+import psycopg2
+
+# Load environment variables
+load_dotenv()
+
+# Defaults to the database published by docker-compose.yml
+DEFAULT_DATABASE_URL = os.getenv('BACKFILL_DATABASE_URL') or (
+    f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}"
+    f"@localhost:5432/{os.getenv('POSTGRES_DB')}"
+)
+DEFAULT_BATCH_SIZE = 1000
+
+# National number of a stored guest: the digits after the country code of its
+# E.164 phone_number (all digits if the number does not start with it)
+NATIONAL_NUMBER_SQL = r"""
+    regexp_replace(
+        CASE WHEN starts_with(phone_number, country_code)
+             THEN substr(phone_number, length(country_code) + 1)
+             ELSE phone_number
+        END,
+        '\D', '', 'g'
+    )
+"""
+
+# One batch per transaction keeps row locks and WAL bursts short on a live table
+BACKFILL_BATCH_SQL = f"""
+    UPDATE guests
+    SET national_number = {NATIONAL_NUMBER_SQL}
+    WHERE id IN (
+        SELECT id FROM guests
+        WHERE national_number IS NULL
+        ORDER BY id
+        LIMIT %s
+    )
+"""
+
+def backfill(conn, batch_size=DEFAULT_BATCH_SIZE, pause=0.0):
+    """Fill in missing national numbers batch by batch, returning the row count"""
+    total = 0
+    while True:
+        with conn, conn.cursor() as cur:
+            cur.execute(BACKFILL_BATCH_SQL, (batch_size,))
+            updated = cur.rowcount
+        if not updated:
+            return total
+        total += updated
+        print(f"Backfilled {total} guests")
+        if pause:
+            time.sleep(pause)
+
+def main():
+    parser = argparse.ArgumentParser(description='Fill in guests.national_number for guests saved before migration 005')
+    parser.add_argument('--database-url', default=DEFAULT_DATABASE_URL,
+                        help='Target database (default: BACKFILL_DATABASE_URL or the local docker-compose database)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Guests updated per transaction (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--pause', type=float, default=0.0,
+                        help='Seconds to wait between batches')
+    args = parser.parse_args()
+
+    try:
+        conn = psycopg2.connect(args.database_url)
+        try:
+            total = backfill(conn, args.batch_size, args.pause)
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"Error during backfill: {str(e)}")
+        sys.exit(1)
+
+    print(f"Backfill complete, {total} guests updated")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,19 @@
 import os
 import json
-from datetime import datetime
+import shutil
+import argparse
+from contextlib import contextmanager
+from datetime import datetime, timezone
 import sshtunnel
-import pandas as pd
 from dotenv import load_dotenv
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+from backup_format import (
+    TABLES, COMPRESSION_EXTENSIONS, begin_consistent_read, merge_backup_sets,
+    verify_backup_set, write_backup_set, write_xlsx
+)
+
 # Load environment variables
 load_dotenv()
 
@@ -19,96 +26,208 @@ DB_USER = os.getenv('POSTGRES_USER')
 DB_PASS = os.getenv('POSTGRES_PASSWORD')
 DB_NAME = os.getenv('POSTGRES_DB')
 
-def backup_data():
-    try:
-        # Create SSH tunnel
-        with sshtunnel.SSHTunnelForwarder(
-            (SSH_HOST, 22),  # Remote SSH address and port
-            ssh_username=SSH_USER,
-            remote_bind_address=(REMOTE_DB_HOST, REMOTE_DB_PORT)
-        ) as tunnel:
-            print(f"SSH tunnel established on local port {tunnel.local_bind_port}")
-            
-            # Connect to PostgreSQL using psycopg2
-            conn = psycopg2.connect(
-                dbname=DB_NAME,
-                user=DB_USER,
-                password=DB_PASS,
-                host='127.0.0.1',
-                port=tunnel.local_bind_port,
-                cursor_factory=RealDictCursor
-            )
-            
-            # Create a cursor
-            cur = conn.cursor()
-
-            # Check table structure
-            print("\nChecking database structure:")
-            cur.execute("""
-                SELECT table_name, column_name, data_type 
-                FROM information_schema.columns 
-                WHERE table_schema = 'public'
-                ORDER BY table_name, ordinal_position;
-            """)
-            for row in cur.fetchall():
-                print(f"Table: {row['table_name']}, Column: {row['column_name']}, Type: {row['data_type']}")
-            
-            # Get all guests
-            cur.execute("""
-                SELECT id, full_name, phone_number, country_code, 
-                       created_at, updated_at
-                FROM guests
-            """)
-            guest_data = [dict(row) for row in cur.fetchall()]
-            
-            # Get all RSVPs
-            cur.execute("""
-                SELECT id, guest_id, guest_relationship, household_count,
-                       food_allergies, is_visiting_venue, arrival_date,
-                       additional_notes, created_at, updated_at
-                FROM rsvp_responses
-            """)
-            rsvp_data = [dict(row) for row in cur.fetchall()]
-
-            # Close database connection
-            cur.close()
+BACKUP_DIR = os.path.join(os.path.dirname(__file__), '..', 'backups')
+STATE_FILE = os.path.join(BACKUP_DIR, 'state.json')
+SNAPSHOT_DIR = os.path.join(BACKUP_DIR, 'snapshots')
+JOURNAL_DIR = os.path.join(BACKUP_DIR, 'journal')
+
+# Incremental runs only pull rows older than this many seconds, so a write
+# transaction that stamped updated_at before the run but commits after it is
+# picked up by the next run instead of being skipped.
+DEFAULT_LAG_SECONDS = 60
+DEFAULT_FULL_EVERY_HOURS = 24
+DEFAULT_COMPACT_AFTER_RUNS = 100
+DEFAULT_KEEP_SNAPSHOTS = 3
+DEFAULT_COMPRESSION = 'gzip'
+
+@contextmanager
+def open_connection():
+    """Connect to the production database through an SSH tunnel"""
+    with sshtunnel.SSHTunnelForwarder(
+        (SSH_HOST, 22),  # Remote SSH address and port
+        ssh_username=SSH_USER,
+        remote_bind_address=(REMOTE_DB_HOST, REMOTE_DB_PORT)
+    ) as tunnel:
+        print(f"SSH tunnel established on local port {tunnel.local_bind_port}")
+
+        # Connect to PostgreSQL using psycopg2
+        conn = psycopg2.connect(
+            dbname=DB_NAME,
+            user=DB_USER,
+            password=DB_PASS,
+            host='127.0.0.1',
+            port=tunnel.local_bind_port,
+            cursor_factory=RealDictCursor
+        )
+        try:
+            yield conn
+        finally:
             conn.close()
 
-            # Convert datetime objects to ISO format strings
-            for guest in guest_data:
-                guest['created_at'] = guest['created_at'].isoformat() if guest['created_at'] else None
-                guest['updated_at'] = guest['updated_at'].isoformat() if guest['updated_at'] else None
-            
-            for rsvp in rsvp_data:
-                rsvp['created_at'] = rsvp['created_at'].isoformat() if rsvp['created_at'] else None
-                rsvp['updated_at'] = rsvp['updated_at'].isoformat() if rsvp['updated_at'] else None
-
-            # Create backup directory if it doesn't exist
-            backup_dir = os.path.join(os.path.dirname(__file__), '..', 'backups')
-            os.makedirs(backup_dir, exist_ok=True)
-
-            # Save as JSON
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            with open(os.path.join(backup_dir, f'backup_{timestamp}.json'), 'w') as f:
-                json.dump({
-                    'guests': guest_data,
-                    'rsvps': rsvp_data
-                }, f, indent=2)
-
-            # Save as Excel (more readable for humans)
-            guests_df = pd.DataFrame(guest_data)
-            rsvps_df = pd.DataFrame(rsvp_data)
-            
-            with pd.ExcelWriter(os.path.join(backup_dir, f'backup_{timestamp}.xlsx')) as writer:
-                guests_df.to_excel(writer, sheet_name='Guests', index=False)
-                rsvps_df.to_excel(writer, sheet_name='RSVPs', index=False)
-
-            print(f"\nBackup completed! Files saved in {backup_dir}")
-            print(f"Total guests: {len(guest_data)}")
-            print(f"Total RSVPs: {len(rsvp_data)}")
+def _timestamp():
+    return datetime.now().strftime('%Y%m%d_%H%M%S')
+
+def _print_manifest(path, manifest):
+    for table, entry in manifest['tables'].items():
+        print(f"  {table}: {entry['rows']} rows, {entry['bytes']} bytes, sha256 {entry['sha256'][:12]}")
+
+def backup_data(compression=DEFAULT_COMPRESSION, xlsx=False):
+    """Write a full backup set to backups/backup_<timestamp>/"""
+    try:
+        path = os.path.join(BACKUP_DIR, f'backup_{_timestamp()}')
+        with open_connection() as conn:
+            begin_consistent_read(conn)
+            manifest = write_backup_set(conn, path, compression)
+            conn.rollback()
+
+        print(f"\nBackup completed! Files saved in {path}")
+        _print_manifest(path, manifest)
+
+        # The spreadsheet is derived from the files, not from the database
+        if xlsx:
+            print(f"Excel copy saved as {write_xlsx(path, f'{path}.xlsx')}")
 
     except Exception as e:
         print(f"Error during backup: {str(e)}")
 
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return None
+    with open(STATE_FILE) as f:
+        return json.load(f)
+
+def save_state(state):
+    # Write then rename so an interrupted run never leaves a torn state file
+    tmp_path = f"{STATE_FILE}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, STATE_FILE)
+
+def take_snapshot(conn, lag_seconds, compression=DEFAULT_COMPRESSION):
+    """Write a full snapshot of every table, record it and start a new journal"""
+    snapshot_path = os.path.join(SNAPSHOT_DIR, _timestamp())
+    high = begin_consistent_read(conn, lag_seconds)
+    manifest = write_backup_set(
+        conn, snapshot_path, compression, watermark={'high': high.isoformat()}
+    )
+    conn.rollback()
+
+    state = {
+        'snapshot': os.path.relpath(snapshot_path, BACKUP_DIR),
+        'snapshot_at': datetime.now(timezone.utc).isoformat(),
+        'watermarks': {table: high.isoformat() for table in TABLES},
+        'journal': [],
+        'compression': compression,
+    }
+    # The old journal goes only once the state no longer lists its runs
+    save_state(state)
+    shutil.rmtree(JOURNAL_DIR, ignore_errors=True)
+    print(f"Full snapshot written to {snapshot_path}")
+    _print_manifest(snapshot_path, manifest)
+    return state
+
+def pull_changes(conn, state, lag_seconds):
+    """Write rows changed since the last run as a new backup set in the journal.
+
+    Deleted rows are not seen here; the periodic full snapshot picks them up.
+    Every table shares one watermark, which all runs advance together.
+    """
+    run_path = os.path.join(JOURNAL_DIR, _timestamp())
+    high = begin_consistent_read(conn, lag_seconds)
+    low = min(state['watermarks'].values(), key=datetime.fromisoformat)
+    manifest = write_backup_set(
+        conn, run_path, state.get('compression', DEFAULT_COMPRESSION),
+        'WHERE updated_at > %s AND updated_at <= %s', (low, high),
+        watermark={'low': low, 'high': high.isoformat()}
+    )
+    conn.rollback()
+
+    high = max(low, high.isoformat(), key=datetime.fromisoformat)
+    state['watermarks'] = {table: high for table in TABLES}
+    state['journal'].append(os.path.relpath(run_path, BACKUP_DIR))
+    print(f"Journaled changed rows since last run to {run_path}")
+    _print_manifest(run_path, manifest)
+    return state
+
+def compact(state, keep_snapshots=DEFAULT_KEEP_SNAPSHOTS):
+    """Fold the journal into the latest snapshot, producing a new snapshot.
+
+    Rows are merged by id; the version with the latest updated_at wins.
+    """
+    new_path = os.path.join(SNAPSHOT_DIR, f'{_timestamp()}_compacted')
+    sources = [os.path.join(BACKUP_DIR, relpath) for relpath in [state['snapshot']] + state['journal']]
+    for source in sources:
+        verify_backup_set(source)
+    manifest = merge_backup_sets(
+        sources, new_path, state.get('compression', DEFAULT_COMPRESSION),
+        watermark={'high': max(state['watermarks'].values(), key=datetime.fromisoformat)}
+    )
+
+    state['snapshot'] = os.path.relpath(new_path, BACKUP_DIR)
+    state['journal'] = []
+    save_state(state)
+    shutil.rmtree(JOURNAL_DIR, ignore_errors=True)
+
+    snapshots = sorted(os.listdir(SNAPSHOT_DIR))
+    for name in snapshots[:-keep_snapshots]:
+        shutil.rmtree(os.path.join(SNAPSHOT_DIR, name), ignore_errors=True)
+
+    print(f"Compacted journal into {new_path}")
+    _print_manifest(new_path, manifest)
+    return state
+
+def incremental_backup(full_every_hours=DEFAULT_FULL_EVERY_HOURS, lag_seconds=DEFAULT_LAG_SECONDS,
+                       compact_after_runs=DEFAULT_COMPACT_AFTER_RUNS, compression=DEFAULT_COMPRESSION):
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        state = load_state()
+        with open_connection() as conn:
+            snapshot_age_hours = None
+            if state is not None:
+                snapshot_at = datetime.fromisoformat(state['snapshot_at'])
+                snapshot_age_hours = (datetime.now(timezone.utc) - snapshot_at).total_seconds() / 3600
+
+            if state is None or 'journal' not in state or snapshot_age_hours >= full_every_hours:
+                state = take_snapshot(conn, lag_seconds, compression)
+            else:
+                state = pull_changes(conn, state, lag_seconds)
+                save_state(state)
+
+        if len(state['journal']) >= compact_after_runs:
+            compact(state)
+
+    except Exception as e:
+        print(f"Error during incremental backup: {str(e)}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Back up the wedding RSVP database')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--incremental', action='store_true',
+                      help='Journal rows changed since the last run (takes a full snapshot when due)')
+    mode.add_argument('--compact', action='store_true',
+                      help='Fold the change journal into a new snapshot')
+    parser.add_argument('--full-every', type=float, default=DEFAULT_FULL_EVERY_HOURS,
+                        help=f"Hours between full snapshots (default: {DEFAULT_FULL_EVERY_HOURS})")
+    parser.add_argument('--lag', type=float, default=DEFAULT_LAG_SECONDS,
+                        help=f"Seconds to stay behind the newest writes (default: {DEFAULT_LAG_SECONDS})")
+    parser.add_argument('--compact-after', type=int, default=DEFAULT_COMPACT_AFTER_RUNS,
+                        help=f"Journal runs before compacting automatically (default: {DEFAULT_COMPACT_AFTER_RUNS})")
+    parser.add_argument('--compression', choices=sorted(COMPRESSION_EXTENSIONS), default=DEFAULT_COMPRESSION,
+                        help=f"Compression for new backup files (default: {DEFAULT_COMPRESSION}; zstd needs zstandard)")
+    parser.add_argument('--xlsx', action='store_true',
+                        help='Also derive an Excel workbook from a full backup')
+    args = parser.parse_args()
+
+    if args.incremental:
+        incremental_backup(args.full_every, args.lag, args.compact_after, args.compression)
+    elif args.compact:
+        state = load_state()
+        if state is None:
+            print("No incremental backup found, run with --incremental first")
+            return
+        compact(state)
+    else:
+        backup_data(args.compression, args.xlsx)
+
 if __name__ == "__main__":
-    backup_data() 
\ No newline at end of file
+    main()
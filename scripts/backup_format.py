@@ -0,0 +1,266 @@
+"""On-disk format shared by the backup and restore scripts.
+
+A backup set is a directory holding one compressed CSV file per table, as
+written by PostgreSQL's ``COPY ... TO STDOUT``, plus a ``manifest.json`` with
+each file's row count and SHA-256 checksum.
+"""
+import io
+import os
+import csv
+import gzip
+import json
+import heapq
+import hashlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from itertools import groupby
+
+# Columns backed up for each table, in restore order
+TABLES = {
+    'guests': [
+        'id', 'full_name', 'phone_number', 'country_code', 'created_at', 'updated_at'
+    ],
+    'rsvp_responses': [
+        'id', 'guest_id', 'guest_relationship', 'household_count', 'food_allergies',
+        'is_visiting_venue', 'arrival_date', 'additional_notes', 'created_at', 'updated_at'
+    ],
+}
+
+# NULL is written as \N so it survives a round trip through Python's csv
+# module, which cannot tell an unquoted empty field from a quoted one.
+NULL_MARKER = '\\N'
+COPY_OPTIONS = "FORMAT csv, HEADER true, NULL '\\N'"
+COPY_CHUNK_BYTES = 64 * 1024
+
+COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_VERSION = 1
+
+
+class BackupVerificationError(Exception):
+    """Raised when a backup set does not match its manifest"""
+
+
+class _HashingWriter:
+    """Counts and checksums the bytes passed through to a file"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.sha256 = hashlib.sha256()
+        self.bytes = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.bytes += len(data)
+        return self.raw.write(data)
+
+    def flush(self):
+        self.raw.flush()
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd compression requires the zstandard package")
+    return zstandard
+
+@contextmanager
+def _compressed_writer(path, compression):
+    """Yield a binary stream compressing into ``path`` and its hashing writer.
+
+    The checksum covers the compressed file, so read it after the block exits.
+    """
+    with open(path, 'wb') as raw:
+        hashing = _HashingWriter(raw)
+        if compression == 'zstd':
+            writer = _zstandard().ZstdCompressor().stream_writer(hashing, closefd=False)
+        else:
+            writer = gzip.GzipFile(filename='', mode='wb', fileobj=hashing, mtime=0)
+        try:
+            yield writer, hashing
+        finally:
+            writer.close()
+
+def _open_text(path, compression):
+    """Open a compressed CSV file for reading as text"""
+    if compression == 'zstd':
+        raw = open(path, 'rb')
+        return io.TextIOWrapper(
+            _zstandard().ZstdDecompressor().stream_reader(raw, closefd=True),
+            encoding='utf-8', newline=''
+        )
+    return gzip.open(path, 'rt', encoding='utf-8', newline='')
+
+def open_table(path, table, manifest=None):
+    """Open a table's decompressed CSV (header included) from a backup set"""
+    manifest = manifest or read_manifest(path)
+    entry = manifest['tables'][table]
+    return _open_text(os.path.join(path, entry['file']), manifest['compression'])
+
+def iter_rows(path, table, manifest=None):
+    """Yield a table's rows from a backup set as lists of strings"""
+    with open_table(path, table, manifest) as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        yield from reader
+
+def _iter_records(path, table, manifest):
+    """Yield a table's rows from a backup set together with their CSV text.
+
+    csv.reader drops the quotes that tell a quoted "\\N" string from a NULL,
+    so rows are copied between backup sets as the text COPY wrote.
+    """
+    with open_table(path, table, manifest) as f:
+        lines = []
+
+        def read_lines():
+            for line in f:
+                lines.append(line)
+                yield line
+
+        # The reader pulls lines only until its record is complete
+        reader = csv.reader(read_lines())
+        next(reader, None)
+        lines.clear()
+        for row in reader:
+            text = ''.join(lines)
+            lines.clear()
+            yield row, text if text.endswith('\n') else text + '\n'
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+def _write_manifest(path, manifest):
+    tmp_path = os.path.join(path, f'{MANIFEST_FILE}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, MANIFEST_FILE))
+
+def _new_manifest(compression, **extra):
+    return {
+        'version': MANIFEST_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'format': 'csv',
+        'copy_options': COPY_OPTIONS,
+        'compression': compression,
+        'tables': {},
+        **extra,
+    }
+
+def _table_entry(table, filename, rows, hashing):
+    return {
+        'file': filename,
+        'columns': TABLES[table],
+        'rows': rows,
+        'bytes': hashing.bytes,
+        'sha256': hashing.sha256.hexdigest(),
+    }
+
+def write_backup_set(conn, path, compression='gzip', where='', params=None, **extra):
+    """COPY every table into ``path`` and write its manifest.
+
+    Rows stream from the server straight into the compressor, so memory use
+    does not grow with the table size. Call inside one transaction (see
+    ``begin_consistent_read``) so all tables come from the same snapshot.
+    """
+    os.makedirs(path, exist_ok=True)
+    manifest = _new_manifest(compression, **extra)
+    with conn.cursor() as cur:
+        for table, columns in TABLES.items():
+            query = f"SELECT {', '.join(columns)} FROM {table} {where} ORDER BY id"
+            if params:
+                query = cur.mogrify(query, params).decode('utf-8')
+            filename = f'{table}.csv{COMPRESSION_EXTENSIONS[compression]}'
+            with _compressed_writer(os.path.join(path, filename), compression) as (writer, hashing):
+                cur.copy_expert(
+                    f"COPY ({query}) TO STDOUT WITH ({COPY_OPTIONS})", writer, size=COPY_CHUNK_BYTES
+                )
+            # Counted in the same snapshot as the COPY
+            cur.execute(f"SELECT count(*) AS rows FROM ({query}) AS t")
+            manifest['tables'][table] = _table_entry(table, filename, cur.fetchone()['rows'], hashing)
+    _write_manifest(path, manifest)
+    return manifest
+
+def begin_consistent_read(conn, lag_seconds=0):
+    """Start a repeatable-read transaction and return its upper watermark.
+
+    Every table is read from the same database snapshot, and only rows last
+    updated at least ``lag_seconds`` ago are taken.
+    """
+    conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+    with conn.cursor() as cur:
+        cur.execute("SELECT NOW() - make_interval(secs => %s) AS high", (lag_seconds,))
+        return cur.fetchone()['high']
+
+def verify_backup_set(path):
+    """Check every file against the manifest's checksum and row count"""
+    manifest = read_manifest(path)
+    for table, entry in manifest['tables'].items():
+        file_path = os.path.join(path, entry['file'])
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(COPY_CHUNK_BYTES), b''):
+                sha256.update(chunk)
+        if sha256.hexdigest() != entry['sha256']:
+            raise BackupVerificationError(f"Checksum mismatch for {file_path}")
+        rows = sum(1 for _ in iter_rows(path, table, manifest))
+        if rows != entry['rows']:
+            raise BackupVerificationError(
+                f"{file_path} has {rows} rows, manifest says {entry['rows']}"
+            )
+    return manifest
+
+def _updated_at(value):
+    if value == NULL_MARKER or not value:
+        return datetime.min.replace(tzinfo=timezone.utc)
+    return datetime.fromisoformat(value)
+
+def merge_backup_sets(sources, path, compression='gzip', **extra):
+    """Merge backup sets into a new one holding the latest version of each row.
+
+    Every source is sorted by id, so the sets are merged as streams; for each
+    id the row with the latest updated_at wins, later sources breaking ties.
+    The winning rows are written exactly as they were read.
+    """
+    os.makedirs(path, exist_ok=True)
+    manifest = _new_manifest(compression, **extra)
+    manifests = [read_manifest(source) for source in sources]
+    for table, columns in TABLES.items():
+        updated_at_index = columns.index('updated_at')
+        streams = [
+            ((int(row[0]), order, row, record) for row, record in _iter_records(source, table, source_manifest))
+            for order, (source, source_manifest) in enumerate(zip(sources, manifests))
+            if table in source_manifest['tables']
+        ]
+        filename = f'{table}.csv{COMPRESSION_EXTENSIONS[compression]}'
+        rows = 0
+        with _compressed_writer(os.path.join(path, filename), compression) as (writer, hashing):
+            text = io.TextIOWrapper(writer, encoding='utf-8', newline='', write_through=True)
+            text.write(','.join(columns) + '\n')
+            for _, versions in groupby(heapq.merge(*streams), key=lambda item: item[0]):
+                _, _, _, record = max(
+                    versions, key=lambda item: (_updated_at(item[2][updated_at_index]), item[1])
+                )
+                text.write(record)
+                rows += 1
+            text.flush()
+            text.detach()
+        manifest['tables'][table] = _table_entry(table, filename, rows, hashing)
+    _write_manifest(path, manifest)
+    return manifest
+
+def write_xlsx(path, xlsx_path):
+    """Derive a human-readable workbook, one sheet per table, from a backup set"""
+    from openpyxl import Workbook
+
+    manifest = read_manifest(path)
+    workbook = Workbook(write_only=True)
+    for table in manifest['tables']:
+        sheet = workbook.create_sheet(title=table)
+        with open_table(path, table, manifest) as f:
+            for row in csv.reader(f):
+                sheet.append([None if value == NULL_MARKER else value for value in row])
+    workbook.save(xlsx_path)
+    return xlsx_path
@@ -0,0 +1,68 @@
+import os
+import sys
+import argparse
+import urllib.error
+
+from api_client import add_api_arguments, admin_request
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+EXTENSION_FORMATS = {
+    '.csv': 'csv',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.xlsx': 'xlsx',
+}
+
+def import_guests(path, api_url, token, fmt=None):
+    if fmt is None:
+        fmt = EXTENSION_FORMATS.get(os.path.splitext(path)[1].lower())
+        if fmt is None:
+            raise ValueError(f"Cannot tell the format of {path}, pass --format")
+
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    return admin_request(
+        api_url, token, f"/guests/import?format={fmt}",
+        data=data, content_type=CONTENT_TYPES[fmt]
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk import guests and RSVPs into the wedding API')
+    parser.add_argument('path', help='CSV, XLSX or NDJSON file to import')
+    parser.add_argument('--format', choices=sorted(CONTENT_TYPES), help='File format (default: from extension)')
+    add_api_arguments(parser)
+    args = parser.parse_args()
+
+    if not args.token:
+        parser.error('An admin token is required, set ADMIN_API_TOKEN or pass --token')
+
+    try:
+        report = import_guests(args.path, args.api_url, args.token, args.format)
+    except urllib.error.HTTPError as e:
+        print(f"Import failed with HTTP {e.code}: {e.read().decode('utf-8', 'replace')}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error during import: {str(e)}")
+        sys.exit(1)
+
+    print(f"Rows read: {report['total']}")
+    print(f"Inserted: {report['inserted']}")
+    print(f"Updated: {report['updated']}")
+    print(f"Failed: {report['failed']}")
+    for error in report['errors']:
+        print(f"  Row {error['row']}: {'; '.join(error['errors'])}")
+    print(f"Superseded: {len(report['superseded'])}")
+    for row in report['superseded']:
+        print(f"  Row {row['row']}: replaced by row {row['supersededBy']} with the same phone number")
+
+    if report['failed']:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import sys
+import argparse
+import urllib.error
+
+from api_client import add_api_arguments, admin_request
+
+def main():
+    parser = argparse.ArgumentParser(description='Recount the RSVP statistics summary and report drift')
+    add_api_arguments(parser)
+    args = parser.parse_args()
+
+    if not args.token:
+        parser.error('An admin token is required, set ADMIN_API_TOKEN or pass --token')
+
+    try:
+        result = admin_request(args.api_url, args.token, '/stats/rebuild')
+    except urllib.error.HTTPError as e:
+        print(f"Rebuild failed with HTTP {e.code}: {e.read().decode('utf-8', 'replace')}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error during rebuild: {str(e)}")
+        sys.exit(1)
+
+    if not result['drift']:
+        print("Statistics were already in sync")
+    for bucket in result['drift']:
+        before, after = bucket['before'], bucket['after']
+        print(
+            f"{bucket['dimension']}={bucket['bucket']}: "
+            f"{before['responses']} -> {after['responses']} responses, "
+            f"{before['people']} -> {after['people']} people"
+        )
+
+    totals = result['stats']['totals']
+    print(f"Total: {totals['responses']} responses, {totals['people']} people")
+
+if __name__ == "__main__":
+    main()
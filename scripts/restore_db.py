@@ -0,0 +1,204 @@
+import os
+import sys
+import time
+import argparse
+from contextlib import contextmanager
+from dotenv import load_dotenv
+import psycopg2
+
+from backup_format import TABLES, BackupVerificationError, open_table, read_manifest, verify_backup_set
+from backfill_national_numbers import NATIONAL_NUMBER_SQL
+
+# Load environment variables
+load_dotenv()
+
+# Defaults to the database published by docker-compose.yml
+DEFAULT_DATABASE_URL = os.getenv('RESTORE_DATABASE_URL') or (
+    f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}"
+    f"@localhost:5432/{os.getenv('POSTGRES_DB')}"
+)
+
+# Unique and foreign key constraints on the restored tables. Primary keys are
+# kept because the foreign keys depend on them.
+CONSTRAINTS_SQL = """
+    SELECT conrelid::regclass::text AS table_name, conname AS name, contype AS type,
+           pg_get_constraintdef(oid) AS definition
+    FROM pg_constraint
+    WHERE conrelid = ANY(%s::regclass[]) AND contype IN ('u', 'f')
+"""
+
+# Secondary indexes that do not back a constraint
+INDEXES_SQL = """
+    SELECT indexrelid::regclass::text AS name, pg_get_indexdef(indexrelid) AS definition
+    FROM pg_index i
+    WHERE indrelid = ANY(%s::regclass[])
+      AND NOT indisprimary
+      AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+"""
+
+
+class Timer:
+    """Collects and prints the duration of each restore phase"""
+
+    def __init__(self):
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - started
+        self.phases.append((name, elapsed))
+        print(f"{name}: {elapsed:.2f}s")
+
+    def report(self):
+        total = sum(elapsed for _, elapsed in self.phases)
+        print(f"\nRestore completed in {total:.2f}s")
+        for name, elapsed in self.phases:
+            print(f"  {name:<24} {elapsed:8.2f}s")
+
+
+def _existing_rows(cur, tables):
+    counts = {}
+    for table in tables:
+        cur.execute(f"SELECT count(*) FROM {table}")
+        counts[table] = cur.fetchone()[0]
+    return counts
+
+def drop_deferred_checks(cur, tables):
+    """Drop secondary indexes and unique/foreign key constraints.
+
+    Returns the statements that recreate them, in a valid order.
+    """
+    cur.execute(CONSTRAINTS_SQL, (list(tables),))
+    constraints = cur.fetchall()
+    cur.execute(INDEXES_SQL, (list(tables),))
+    indexes = cur.fetchall()
+
+    # Foreign keys go first when dropping and last when recreating
+    constraints.sort(key=lambda constraint: constraint[2] != 'f')
+    for table_name, name, _, _ in constraints:
+        cur.execute(f'ALTER TABLE {table_name} DROP CONSTRAINT "{name}"')
+    for name, _ in indexes:
+        cur.execute(f"DROP INDEX {name}")
+
+    return (
+        [definition for _, definition in indexes]
+        + [
+            f'ALTER TABLE {table_name} ADD CONSTRAINT "{name}" {definition}'
+            for table_name, name, _, definition in reversed(constraints)
+        ]
+    )
+
+def load_table(cur, path, table, manifest):
+    entry = manifest['tables'][table]
+    with open_table(path, table, manifest) as f:
+        cur.copy_expert(
+            f"COPY {table} ({', '.join(entry['columns'])}) FROM STDIN WITH ({manifest['copy_options']})",
+            f
+        )
+    cur.execute(f"SELECT count(*) FROM {table}")
+    loaded = cur.fetchone()[0]
+    if loaded != entry['rows']:
+        raise BackupVerificationError(f"Loaded {loaded} rows into {table}, manifest says {entry['rows']}")
+    return loaded
+
+def derive_national_numbers(cur):
+    """Fill in guests.national_number, which backups do not store"""
+    cur.execute(
+        "SELECT 1 FROM information_schema.columns"
+        " WHERE table_name = 'guests' AND column_name = 'national_number'"
+    )
+    if cur.fetchone():
+        cur.execute(f"UPDATE guests SET national_number = {NATIONAL_NUMBER_SQL}")
+
+def reset_sequence(cur, table):
+    cur.execute(
+        f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}",
+        (table,)
+    )
+
+def restore(path, database_url, replace=False, verify=True):
+    timer = Timer()
+
+    if verify:
+        with timer.phase('Verify manifest'):
+            manifest = verify_backup_set(path)
+    else:
+        manifest = read_manifest(path)
+
+    # Parents before children so the order also suits the foreign keys
+    tables = [table for table in TABLES if table in manifest['tables']]
+
+    conn = psycopg2.connect(database_url)
+    try:
+        # One transaction: a failed restore leaves the database untouched
+        with conn, conn.cursor() as cur:
+            existing = _existing_rows(cur, tables)
+            if any(existing.values()):
+                if not replace:
+                    raise RuntimeError(
+                        f"Target tables are not empty ({existing}), pass --replace to overwrite them"
+                    )
+                with timer.phase('Truncate'):
+                    cur.execute(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY")
+
+            with timer.phase('Drop indexes/constraints'):
+                recreate = drop_deferred_checks(cur, tables)
+                for table in tables:
+                    cur.execute(f"ALTER TABLE {table} DISABLE TRIGGER USER")
+
+            for table in tables:
+                with timer.phase(f'Load {table}'):
+                    rows = load_table(cur, path, table, manifest)
+                print(f"  {rows} rows")
+
+            if 'guests' in tables:
+                # Still without indexes and triggers, so updated_at is kept
+                with timer.phase('Derive national numbers'):
+                    derive_national_numbers(cur)
+
+            with timer.phase('Rebuild indexes/constraints'):
+                for table in tables:
+                    cur.execute(f"ALTER TABLE {table} ENABLE TRIGGER USER")
+                for statement in recreate:
+                    cur.execute(statement)
+
+            with timer.phase('Reset sequences'):
+                for table in tables:
+                    reset_sequence(cur, table)
+
+            with timer.phase('Rebuild statistics'):
+                # The row triggers were off during the load
+                cur.execute("SELECT to_regproc('rebuild_rsvp_stats') IS NOT NULL")
+                if cur.fetchone()[0]:
+                    cur.execute("SELECT rebuild_rsvp_stats()")
+                for table in tables:
+                    cur.execute(f"ANALYZE {table}")
+    finally:
+        conn.close()
+
+    timer.report()
+
+def main():
+    parser = argparse.ArgumentParser(description='Restore a backup made by backup_db.py into PostgreSQL')
+    parser.add_argument('path', help='Backup directory containing manifest.json')
+    parser.add_argument('--database-url', default=DEFAULT_DATABASE_URL,
+                        help='Target database (default: RESTORE_DATABASE_URL or the local docker-compose database)')
+    parser.add_argument('--replace', action='store_true',
+                        help='Truncate existing guests and RSVPs before loading')
+    parser.add_argument('--no-verify', action='store_true',
+                        help='Skip checking file checksums and row counts before loading')
+    args = parser.parse_args()
+
+    try:
+        restore(args.path, args.database_url, replace=args.replace, verify=not args.no_verify)
+    except BackupVerificationError as e:
+        print(f"Backup verification failed: {str(e)}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error during restore: {str(e)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()